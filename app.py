@@ -2,52 +2,261 @@
 RAG Chatbot for Resume Search using LangChain and Streamlit.
 """
 import os
+# Keep FAISS/OpenMP worker threads from spin-waiting between searches; must be set
+# before faiss is first imported. The FAISS thread count itself is capped through
+# faiss.omp_set_num_threads (configure_faiss_threads), not OMP_NUM_THREADS, which
+# would also limit torch's threads for local embedding.
+os.environ.setdefault("OMP_WAIT_POLICY", "PASSIVE")
 import re
+import time
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import logging
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Union, TYPE_CHECKING
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 import tempfile
 import shutil
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import hashlib
+import html
+import json
+import pickle
+import uuid
+import heapq
+from collections import Counter, defaultdict, deque
+from operator import itemgetter
+from dataclasses import dataclass
+from itertools import chain, islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from utils import (
     process_resume_pdf,
     get_embeddings,
     get_llm,
     create_vector_store,
+    add_documents_to_store,
     load_vector_store,
+    is_flat_index,
+    search_by_vectors,
+    save_vector_store,
+    configure_faiss_threads,
+    available_cpu_count,
     chunk_text,
     save_metadata,
     load_metadata,
+    clear_persisted_data,
     rank_candidates,
-    export_candidates_to_csv,
-    get_skills_distribution
+    QueryCache,
+    simhash,
+    candidates_to_csv_bytes,
+    compute_fit_scores
 )
+if TYPE_CHECKING:
+    import pandas as pd
 try:
     from config import Config
     VECTOR_STORE_DIR = Config.VECTOR_STORE_DIR
     METADATA_FILE = Config.METADATA_FILE
+    MAX_CHAT_HISTORY = Config.MAX_CHAT_HISTORY
+    ENABLE_PERSISTENCE = Config.ENABLE_PERSISTENCE
+    SHOW_SECURITY_WARNING = Config.SHOW_SECURITY_WARNING
+    EMBEDDING_CONFIG = (Config.EMBEDDING_MODEL, Config.EMBEDDING_MODEL_NAME, Config.EMBEDDING_BACKEND, Config.EMBEDDING_DTYPE)
 except ImportError:
     from dotenv import load_dotenv
     load_dotenv()
     VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "./faiss_store")
     METADATA_FILE = os.getenv("METADATA_FILE", "./metadata.pkl")
+    MAX_CHAT_HISTORY = int(os.getenv("MAX_CHAT_HISTORY", "10"))
+    ENABLE_PERSISTENCE = os.getenv("ENABLE_PERSISTENCE", "false").lower() == "true"
+    SHOW_SECURITY_WARNING = os.getenv("SHOW_SECURITY_WARNING", "true").lower() == "true"
+    EMBEDDING_CONFIG = (
+        os.getenv("EMBEDDING_MODEL", "openai").lower(),
+        os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2"),
+        os.getenv("EMBEDDING_BACKEND", "torch").lower(),
+        os.getenv("EMBEDDING_DTYPE", "float32").lower()
+    )
 
-# Configure logging
+# Configure logging (a no-op when config.py already did; this covers running without it)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('app.log'),
+        # delay: app.log is only opened when the first record is written
+        logging.FileHandler('app.log', delay=True),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger(__name__)
 
+configure_faiss_threads()
+
+# Query embeddings kept per session for repeated questions
+QUERY_EMBEDDING_CACHE_SIZE = 128
+
+# Retrieval results kept per session, keyed by normalized question; cleared whenever
+# the vector store changes and expired after a TTL (seconds) as a backstop
+QUERY_RESULT_CACHE_SIZE = 512
+QUERY_RESULT_CACHE_TTL = 300
+
+# Streamed answer text is sent to the browser at most this often (seconds). st.write_stream
+# re-sends the whole answer on every chunk, so per-token updates are quadratic in its length.
+STREAM_FLUSH_INTERVAL = 0.05
+
+# Analytics results are cached process-wide (keyed by metadata signature) and hold
+# candidate details, so entries are bounded in number and expire after a TTL (seconds)
+ANALYTICS_CACHE_ENTRIES = 32
+ANALYTICS_CACHE_TTL = 3600
+
+# Sidebar candidate list: cards shown at first, and added per "Show more" click
+CANDIDATE_LIST_INITIAL = 10
+CANDIDATE_LIST_STEP = 20
+# Below this many candidates filter_candidates walks metadata_list directly; pandas'
+# fixed per-operation overhead only pays off on larger lists
+FILTER_VECTORIZED_MIN = 1000
+
+# Chunks retrieved per question, and the most kept per candidate. Every consumer
+# (LLM context, answer snippets, sources panels) shows all of them, so retrieval
+# never fetches documents that are dropped before rendering.
+RETRIEVAL_K = 10
+MAX_CHUNKS_PER_CANDIDATE = 3
+# Resume text sent to the LLM: each chunk is cut to CONTEXT_CHUNK_CHARS, shrinking
+# (down to CONTEXT_MIN_CHUNK_CHARS) so all chunks together stay within CONTEXT_CHAR_BUDGET
+CONTEXT_CHAR_BUDGET = 6000
+CONTEXT_CHUNK_CHARS = 400
+CONTEXT_MIN_CHUNK_CHARS = 150
+# Chunks of one candidate whose SimHash fingerprints differ in at most this many
+# bits are near-duplicates (e.g. overlapping windows); only the best match is kept
+SIMHASH_DUPLICATE_BITS = 6
+# Reciprocal rank fusion constant for merging a follow-up question's two searches
+RRF_K = 60
+
+# Characters of each chunk stored as metadata["preview"] at ingestion for snippet display
+SNIPPET_PREVIEW_CHARS = 300
+
+APP_CSS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "app.css")
+# Stylesheet minification patterns, applied once by load_app_css
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_WHITESPACE_RE = re.compile(r"\s+")
+_CSS_PUNCT_SPACE_RE = re.compile(r"\s*([{};])\s*")
+
+# Patterns that indicate invalid (header-like) candidate names, compiled once into a single alternation.
+# Whole words only, so surnames such as "McVey" are not caught by "CV".
+_INVALID_NAME_RE = re.compile(
+    r'\b(?:CERTIFICATE|RESUME|CV|CURRICULUM|VITAE|APPLICATION|PAGE\s+\d+)\b|^\d+$', re.IGNORECASE
+)
+
+# Skill categories for the analytics dashboard
+_SKILL_CATEGORIES = {
+    "Programming Languages": ["Python", "JavaScript", "Java", "C++", "C#", "TypeScript", "Go", "Rust", "Swift", "Kotlin", "PHP", "Ruby"],
+    "Web Frameworks": ["React", "Angular", "Vue", "Django", "Flask", "Node.js", "Spring", ".NET"],
+    "Databases": ["SQL", "MongoDB", "PostgreSQL", "MySQL"],
+    "Cloud & DevOps": ["AWS", "Docker", "Kubernetes", "Linux", "Git"],
+    "Machine Learning": ["Machine Learning", "Deep Learning", "TensorFlow", "PyTorch"],
+    "Frontend": ["HTML", "CSS"],
+    "Other": []
+}
+
+# Standard display order for education levels
+_EDUCATION_ORDER = ["PhD", "Master's", "Bachelor's", "Associate's", "Diploma", "Not Specified"]
+
+# Flat lowercase keyword -> category map; insertion order keeps first-category-wins matching
+_KEYWORD_TO_CATEGORY = {
+    keyword.lower(): category
+    for category, keywords in _SKILL_CATEGORIES.items()
+    for keyword in keywords
+}
+
+
+@st.cache_resource(show_spinner=False)
+def load_app_css() -> str:
+    """Read and minify the app stylesheet once per server process."""
+    with open(APP_CSS_FILE, "r", encoding="utf-8") as f:
+        css = f.read()
+    # Drop comments and collapse whitespace so every rerun sends fewer bytes.
+    # Spaces are only removed around braces and semicolons, where they can never
+    # be significant (unlike before ':' in selectors such as "div :hover").
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_WHITESPACE_RE.sub(" ", css)
+    return _CSS_PUNCT_SPACE_RE.sub(r"\1", css).strip()
+
+
+@dataclass
+class ChatMsg:
+    """
+    A single chat turn; sources holds references (see source_refs) to the retrieved
+    Documents for assistant replies and sources_by_candidate the first ten of them
+    grouped for display. sources_rendered caches the sources panel's markdown once the
+    panel is first opened (see history_sources_blocks). msg_id is a stable identity for
+    the message's widgets; id() values are reused once the deque evicts old messages.
+    """
+    # Explicit __slots__ rather than dataclass(slots=True), which needs Python 3.10
+    __slots__ = ("role", "content", "sources", "sources_by_candidate", "sources_rendered", "msg_id")
+    role: str
+    content: str
+    sources: List[Union[str, Document]]
+    sources_by_candidate: Dict[str, List[Union[str, Document]]]
+    sources_rendered: Optional[List[tuple]]
+    msg_id: str
+
+
+def candidate_id(metadata: Dict) -> str:
+    """
+    The candidate a chunk belongs to: its name, or its filename when no name was found.
+    Stored on each chunk at ingestion; derived here for stores saved before that.
+    """
+    return metadata.get("candidate_id") or metadata.get("name") or metadata.get("filename") or "Unknown"
+
+
+def group_sources_by_candidate(docs: List[Document], limit: int = RETRIEVAL_K) -> Dict[str, List[Document]]:
+    """Group the first `limit` source documents by candidate, in retrieval order."""
+    grouped = defaultdict(list)
+    for doc in islice(docs, limit):
+        grouped[candidate_id(doc.metadata)].append(doc)
+    return dict(grouped)
+
+
+def source_refs(docs: List[Document]) -> List[Union[str, Document]]:
+    """
+    Docstore ids of the given documents, so chat history doesn't hold on to chunk text.
+    Documents without an id (older langchain releases don't set one) are kept as is.
+    """
+    return [doc.id if getattr(doc, "id", None) else doc for doc in docs]
+
+
+def resolve_sources(refs: List[Union[str, Document]]) -> List[Document]:
+    """Look source_refs() results back up in the vector store's docstore, skipping any no longer stored."""
+    docstore = getattr(st.session_state.vector_store, "docstore", None)
+    docs = []
+    for ref in refs:
+        if isinstance(ref, Document):
+            docs.append(ref)
+        elif docstore is not None:
+            # InMemoryDocstore.search returns an error string for unknown ids
+            doc = docstore.search(ref)
+            if isinstance(doc, Document):
+                docs.append(doc)
+    return docs
+
+
+def new_chat_history() -> deque:
+    """Chat history bounded to the last MAX_CHAT_HISTORY messages."""
+    return deque(maxlen=MAX_CHAT_HISTORY)
+
+
+# Sections decorated with st.fragment rerun on their own when their widgets change
+# (Streamlit 1.37+); older releases fall back to full-script reruns
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+
+def rerun_fragment():
+    """Rerun just the calling fragment, or the whole script where fragments aren't supported."""
+    try:
+        st.rerun(scope="fragment")
+    except (TypeError, StreamlitAPIException):
+        # No scope argument (before 1.37), or called during a full-script run
+        st.rerun()
+
+
 # Page config
 st.set_page_config(
     page_title="Resume RAG Chatbot",
@@ -61,20 +270,38 @@ if "vector_store" not in st.session_state:
 if "metadata_list" not in st.session_state:
     st.session_state.metadata_list = []
 if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = new_chat_history()
 if "documents_processed" not in st.session_state:
     st.session_state.documents_processed = False
 if "embeddings" not in st.session_state:
     st.session_state.embeddings = None
 if "filtered_candidates" not in st.session_state:
     st.session_state.filtered_candidates = []
+if "candidate_blocks" not in st.session_state:
+    st.session_state.candidate_blocks = {}
+if "query_embeddings" not in st.session_state:
+    st.session_state.query_embeddings = {}
+if "query_cache" not in st.session_state:
+    st.session_state.query_cache = QueryCache(QUERY_RESULT_CACHE_SIZE, QUERY_RESULT_CACHE_TTL)
+if "candidate_list_limit" not in st.session_state:
+    st.session_state.candidate_list_limit = CANDIDATE_LIST_INITIAL
+
+
+@st.cache_resource(show_spinner=False)
+def get_cached_embeddings(provider: str, model_name: str, backend: str, dtype: str):
+    """
+    Load the embedding model once per server process instead of once per session.
+    It holds only read-only weights (or an API client), so it is safe to share
+    across sessions; the arguments key the cache when the config changes.
+    """
+    return get_embeddings()
 
 
 def initialize_embeddings():
-    """Initialize embeddings once and cache in session state."""
+    """Get the shared embedding model, remembered in session state."""
     if st.session_state.embeddings is None:
         try:
-            st.session_state.embeddings = get_embeddings()
+            st.session_state.embeddings = get_cached_embeddings(*EMBEDDING_CONFIG)
         except ImportError as e:
             # Re-raise with helpful message
             raise ImportError(str(e))
@@ -101,52 +328,93 @@ def process_uploaded_pdfs(uploaded_files: List, use_ocr: bool = False):
     temp_dir = tempfile.mkdtemp()
     
     try:
-        for idx, uploaded_file in enumerate(uploaded_files):
-            status_text.text(f"Processing {uploaded_file.name}... ({idx + 1}/{len(uploaded_files)})")
-            
-            # Save uploaded file temporarily
+        # Save all uploads first so worker processes only receive file paths
+        temp_paths = []
+        for uploaded_file in uploaded_files:
             temp_path = os.path.join(temp_dir, uploaded_file.name)
+            # Stream to disk in 1 MB chunks instead of materializing the whole file
+            uploaded_file.seek(0)
             with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            # Process PDF
-            text, metadata = process_resume_pdf(temp_path, use_ocr)
-            
+                shutil.copyfileobj(uploaded_file, f, length=1 << 20)
+            temp_paths.append(temp_path)
+        
+        # Extract text and metadata in parallel. Text-layer parsing and metadata regexes
+        # hold the GIL, so they run in worker processes; OCR time is spent waiting on the
+        # tesseract subprocess, so threads overlap it without process start-up or pickling.
+        # PDFium is not thread-safe, so utils serializes every pypdfium2 call behind a lock and
+        # only the tesseract and poppler subprocesses overlap. OCR is memory hungry, so cap the pool.
+        max_workers = available_cpu_count()
+        executor_class = ProcessPoolExecutor
+        if use_ocr:
+            max_workers = min(max_workers, 4)
+            executor_class = ThreadPoolExecutor
+        max_workers = min(max_workers, len(temp_paths))
+        
+        results = [None] * len(temp_paths)
+        status_text.text(f"Processing {len(uploaded_files)} file(s)...")
+        if max_workers == 1:
+            # One file (or one core) gains nothing from a pool, and starting a worker,
+            # which re-imports utils and its model libraries, can outweigh the parsing
+            for idx, temp_path in enumerate(temp_paths):
+                results[idx] = process_resume_pdf(temp_path, use_ocr)
+                status_text.text(f"Processed {uploaded_files[idx].name} ({idx + 1}/{len(uploaded_files)})")
+                progress_bar.progress((idx + 1) / len(uploaded_files))
+        else:
+            with executor_class(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(process_resume_pdf, temp_path, use_ocr): idx
+                    for idx, temp_path in enumerate(temp_paths)
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    idx = futures[future]
+                    results[idx] = future.result()
+                    status_text.text(f"Processed {uploaded_files[idx].name} ({done}/{len(uploaded_files)})")
+                    progress_bar.progress(done / len(uploaded_files))
+        
+        for text, metadata in results:
             if text.strip():
                 # Chunk the text
                 chunks = chunk_text(text)
                 
-                # Create documents with metadata
-                for chunk in chunks:
-                    doc = Document(
+                # Candidate fields are shared by every chunk of the resume, so the
+                # list joins run once per file rather than once per chunk
+                candidate_metadata = {
+                    "candidate_id": candidate_id(metadata),
+                    "filename": metadata["filename"],
+                    "name": metadata["name"],
+                    "email": metadata["email"],
+                    "phone": metadata["phone"],
+                    "skills": ", ".join(metadata["skills"]),
+                    "years_experience": metadata.get("years_experience", 0),
+                    "education_level": metadata.get("education_level", ""),
+                    "job_titles": ", ".join(metadata.get("job_titles", [])),
+                    "companies": ", ".join(metadata.get("companies", [])),
+                    "location": metadata.get("location", ""),
+                    "certifications": ", ".join(metadata.get("certifications", []))
+                }
+                
+                # Create documents with metadata; all uploads are embedded in one batch below
+                documents.extend(
+                    Document(
                         page_content=chunk,
                         metadata={
-                            "filename": metadata["filename"],
-                            "name": metadata["name"],
-                            "email": metadata["email"],
-                            "phone": metadata["phone"],
-                            "skills": ", ".join(metadata["skills"]),
-                            "years_experience": metadata.get("years_experience", 0),
-                            "education_level": metadata.get("education_level", ""),
-                            "job_titles": ", ".join(metadata.get("job_titles", [])),
-                            "companies": ", ".join(metadata.get("companies", [])),
-                            "location": metadata.get("location", ""),
-                            "certifications": ", ".join(metadata.get("certifications", []))
+                            **candidate_metadata,
+                            "preview": chunk[:SNIPPET_PREVIEW_CHARS],
+                            "simhash": simhash(chunk)
                         }
                     )
-                    documents.append(doc)
+                    for chunk in chunks
+                )
                 
                 metadata_list.append(metadata)
-            
-            progress_bar.progress((idx + 1) / len(uploaded_files))
         
         if documents:
             status_text.text("Creating vector store...")
             
             # Check if persistence is enabled (disabled by default for multi-user)
-            enable_persistence = os.getenv("ENABLE_PERSISTENCE", "false").lower() == "true"
+            enable_persistence = ENABLE_PERSISTENCE
             
-            # Create or update vector store
+            # Create or update vector store (all chunks from this upload are embedded in one batch)
             if st.session_state.vector_store is None:
                 # Only save to disk if persistence is enabled
                 persist_dir = VECTOR_STORE_DIR if enable_persistence else None
@@ -155,13 +423,20 @@ def process_uploaded_pdfs(uploaded_files: List, use_ocr: bool = False):
                 )
             else:
                 # Add new documents to existing store
-                st.session_state.vector_store.add_documents(documents)
+                add_documents_to_store(st.session_state.vector_store, documents, embeddings)
                 # Only save to disk if persistence is enabled
                 if enable_persistence:
-                    st.session_state.vector_store.save_local(VECTOR_STORE_DIR)
+                    save_vector_store(st.session_state.vector_store, VECTOR_STORE_DIR)
+            # Cached answers predate the new chunks
+            st.session_state.query_cache.clear()
             
             # Update metadata (session state only)
             st.session_state.metadata_list.extend(metadata_list)
+            for metadata in metadata_list:
+                st.session_state.candidate_blocks.setdefault(
+                    candidate_id(metadata),
+                    build_candidate_block(candidate_id(metadata), metadata["email"], ", ".join(metadata["skills"]))
+                )
             
             # Only save to disk if persistence is enabled
             if enable_persistence:
@@ -187,25 +462,12 @@ def process_uploaded_pdfs(uploaded_files: List, use_ocr: bool = False):
 def load_existing_store():
     """Load existing vector store if available (only if persistence is enabled)."""
     # Check if persistence is enabled (disabled by default for multi-user deployments)
-    enable_persistence = os.getenv("ENABLE_PERSISTENCE", "false").lower() == "true"
+    enable_persistence = ENABLE_PERSISTENCE
     
     # On Streamlit Cloud or multi-user deployments, disable persistence by default
     if not enable_persistence:
         # Clear any existing persistent data to prevent cross-user data leakage
-        if os.path.exists(VECTOR_STORE_DIR):
-            try:
-                shutil.rmtree(VECTOR_STORE_DIR)
-                logger.info("Cleared persistent vector store (persistence disabled)")
-            except Exception as e:
-                logger.warning(f"Could not clear vector store: {e}")
-        
-        if os.path.exists(METADATA_FILE):
-            try:
-                os.remove(METADATA_FILE)
-                logger.info("Cleared persistent metadata (persistence disabled)")
-            except Exception as e:
-                logger.warning(f"Could not clear metadata: {e}")
-        
+        clear_persisted_data(VECTOR_STORE_DIR, METADATA_FILE)
         return  # Don't load persistent data
     
     # Only load if persistence is explicitly enabled
@@ -231,47 +493,165 @@ def load_existing_store():
         pass
 
 
-# get_llm() is now imported from utils.py
+@st.cache_resource(show_spinner=False)
+def get_cached_llm(provider: str, model: str):
+    """
+    Build the LLM client once per server process for a provider/model pair.
+    The client only holds the server-side API configuration, so it is safe to
+    share across sessions; the arguments key the cache when the config changes.
+    """
+    return get_llm()
 
 
-def format_chat_history(chat_history: List[Dict]) -> List:
+def format_chat_history(chat_history: deque) -> List:
     """Format chat history for LLM context."""
-    messages = []
-    for msg in chat_history[-6:]:  # Keep last 6 messages for context
-        if msg["role"] == "user":
-            messages.append(HumanMessage(content=msg["content"]))
-        elif msg["role"] == "assistant":
-            messages.append(AIMessage(content=msg["content"]))
-    return messages
+    # Keep last 6 messages for context
+    recent = islice(chat_history, max(0, len(chat_history) - 6), None)
+    return [
+        HumanMessage(content=msg.content) if msg.role == "user" else AIMessage(content=msg.content)
+        for msg in recent
+    ]
+
+
+def build_candidate_block(candidate_name: str, email: str, skills: str) -> str:
+    """Build the static prompt header for a candidate (name, email, skills)."""
+    parts = [f"\n[Information from {candidate_name}]"]
+    if email:
+        parts.append(f"\nEmail: {email}")
+    if skills:
+        parts.append(f"\nSkills: {skills}")
+    parts.append("\n\nRelevant sections:")
+    return "".join(parts)
 
 
-def generate_response_with_rag(query: str, llm, source_docs: List[Document]) -> str:
-    """Generate response using RAG with LLM, ensuring all relevant candidates are mentioned."""
+def get_candidate_block(candidate_name: str, metadata: Dict) -> str:
+    """Return the cached prompt header for a candidate, building it on first use."""
+    blocks = st.session_state.candidate_blocks
+    block = blocks.get(candidate_name)
+    if block is None:
+        block = build_candidate_block(candidate_name, metadata.get("email"), metadata.get("skills"))
+        blocks[candidate_name] = block
+    return block
+
+
+def snippet_preview(doc: Document) -> str:
+    """Return the snippet preview cut at ingestion, slicing only for stores saved before it existed."""
+    return doc.metadata.get("preview") or doc.page_content[:SNIPPET_PREVIEW_CHARS]
+
+
+def format_snippets_markdown(docs: List[Document], heading: str, length: int, more: str) -> str:
+    """
+    Render a candidate's first MAX_CHUNKS_PER_CANDIDATE snippets, the overflow note and the closing rule
+    as one markdown string, so each candidate is a single element rather than a
+    heading/info pair per snippet.
+    
+    Args:
+        docs: The candidate's source documents
+        heading: Snippet heading, formatted with the 1-based index {i}
+        length: Characters of the snippet preview to show (at most SNIPPET_PREVIEW_CHARS)
+        more: Overflow note, formatted with the number of remaining snippets {n}
+    """
+    parts = []
+    for i, doc in enumerate(docs[:MAX_CHUNKS_PER_CANDIDATE], 1):
+        # Quote every line so multi-line chunks stay inside the blockquote
+        preview = snippet_preview(doc)
+        if length < len(preview):
+            preview = preview[:length]
+        quoted = preview.replace("\n", "\n> ")
+        parts.append(f"{heading.format(i=i)}\n\n> {quoted}...")
+    if len(docs) > MAX_CHUNKS_PER_CANDIDATE:
+        parts.append(f"_{more.format(n=len(docs) - MAX_CHUNKS_PER_CANDIDATE)}_")
+    parts.append("---")
+    return "\n\n".join(parts)
+
+
+def sources_blocks(sources_by_candidate: Dict[str, List[Document]]) -> List[tuple]:
+    """
+    Markdown for a sources panel: a (heading, caption, snippets) tuple per candidate,
+    with the candidate's metadata read once into a single caption.
+    """
+    blocks = []
+    for candidate_name, docs in sources_by_candidate.items():
+        if not docs:
+            continue
+        meta = docs[0].metadata
+        email, phone = meta.get('email'), meta.get('phone')
+        years, education = meta.get('years_experience', 0), meta.get('education_level')
+        skills = meta.get('skills')
+        
+        contact, background = [], []
+        if email:
+            contact.append(f"📧 {email}")
+        if phone:
+            contact.append(f"📞 {phone}")
+        if years > 0:
+            background.append(f"📊 {years} yrs exp")
+        if education:
+            background.append(f"🎓 {education}")
+        caption_lines = [" · ".join(part) for part in (contact, background) if part]
+        if skills:
+            caption_lines.append(f"🛠️ {skills[:100]}{'...' if len(skills) > 100 else ''}")
+        
+        blocks.append((
+            f"**👤 {candidate_name}**",
+            "  \n".join(caption_lines),
+            format_snippets_markdown(docs, "**📄 Snippet {i}:**", 300, "💡 ... and {n} more snippets from this candidate")
+        ))
+    return blocks
+
+
+def render_sources_blocks(blocks: List[tuple]):
+    """Render the output of sources_blocks."""
+    for heading, caption, snippets in blocks:
+        st.markdown(heading)
+        if caption:
+            st.caption(caption)
+        st.markdown(snippets)
+
+
+def history_sources_blocks(message: ChatMsg) -> List[tuple]:
+    """
+    sources_blocks for a history message, resolved from its docstore references the
+    first time the panel opens and kept on the message, so later reruns only replay
+    the strings. Panels that are never opened keep only the references.
+    """
+    if message.sources_rendered is not None:
+        return message.sources_rendered
+    
+    blocks = sources_blocks({
+        candidate_name: resolve_sources(refs) for candidate_name, refs in message.sources_by_candidate.items()
+    })
+    
+    # Without a store the references can't be resolved yet, so don't cache the empty result
+    if st.session_state.vector_store is not None:
+        message.sources_rendered = blocks
+    return blocks
+
+
+def stream_response_with_rag(query: str, llm, source_docs: List[Document]) -> Iterator[str]:
+    """
+    Stream a RAG response from the LLM, ensuring all relevant candidates are mentioned.
+    Yields text as tokens arrive, for st.write_stream.
+    """
     if not source_docs:
-        return "No relevant information found in the resumes."
+        yield "No relevant information found in the resumes."
+        return
     
     # Group documents by candidate
-    candidates_docs = {}
-    for doc in source_docs:
-        candidate_name = doc.metadata.get("name", doc.metadata.get("filename", "Unknown"))
-        if candidate_name not in candidates_docs:
-            candidates_docs[candidate_name] = []
-        candidates_docs[candidate_name].append(doc)
-    
-    # Format context from source documents, organizing by candidate
-    context_parts = []
-    for candidate_name, docs in candidates_docs.items():
-        candidate_info = f"\n[Information from {candidate_name}]"
-        if docs[0].metadata.get("email"):
-            candidate_info += f"\nEmail: {docs[0].metadata.get('email')}"
-        if docs[0].metadata.get("skills"):
-            candidate_info += f"\nSkills: {docs[0].metadata.get('skills')}"
-        candidate_info += "\n\nRelevant sections:"
-        for i, doc in enumerate(docs[:3], 1):  # Max 3 chunks per candidate
-            candidate_info += f"\n{i}. {doc.page_content[:400]}..."
-        context_parts.append(candidate_info)
+    candidates_docs = group_sources_by_candidate(source_docs, limit=len(source_docs))
     
-    context = "\n\n".join(context_parts)
+    # Share the context budget across the chunks actually sent, so prompt length
+    # (and prefill time) stays bounded however many candidates match
+    chunk_count = sum(min(len(docs), MAX_CHUNKS_PER_CANDIDATE) for docs in candidates_docs.values())
+    chunk_chars = max(CONTEXT_MIN_CHUNK_CHARS, min(CONTEXT_CHUNK_CHARS, CONTEXT_CHAR_BUDGET // chunk_count))
+    
+    # Format context from source documents, organizing by candidate, in one join
+    context = "\n\n".join(
+        get_candidate_block(candidate_name, docs[0].metadata) + "".join(
+            f"\n{i}. {doc.page_content[:chunk_chars]}..." for i, doc in enumerate(docs[:MAX_CHUNKS_PER_CANDIDATE], 1)
+        )
+        for candidate_name, docs in candidates_docs.items()
+    )
     
     # Get all candidate names for the prompt
     all_candidate_names = list(candidates_docs.keys())
@@ -304,74 +684,812 @@ Please provide a comprehensive answer mentioning ALL relevant candidates by name
         HumanMessage(content=prompt)
     ]
     
-    # Generate response
+    # Stream response, batching tokens that arrive within STREAM_FLUSH_INTERVAL of
+    # the last update (the first token is shown immediately)
     try:
-        response = llm.invoke(messages)
-        return response.content
+        pending = []
+        last_flush = 0.0
+        for chunk in llm.stream(messages):
+            content = chunk.content
+            if isinstance(content, str):
+                pending.append(content)
+            else:
+                # Some providers (e.g. Anthropic) stream a list of content blocks
+                pending.extend(block.get("text", "") for block in content if isinstance(block, dict))
+            now = time.monotonic()
+            if now - last_flush >= STREAM_FLUSH_INTERVAL:
+                text = "".join(pending)
+                pending.clear()
+                if text:
+                    yield text
+                    last_flush = now
+        if pending:
+            yield "".join(pending)
     except Exception as e:
         logger.error(f"LLM error: {e}")
         raise
 
 
-def query_vector_store(query: str, k: int = 10) -> List[Document]:
+def format_retrieval_answer(sources_by_candidate: Dict[str, List[Document]]) -> str:
+    """Answer without an LLM: each candidate's contact line and top snippets, joined once."""
+    parts = [f"Found relevant information from {len(sources_by_candidate)} candidate(s):\n\n"]
+    for idx, (candidate_name, docs) in enumerate(sources_by_candidate.items(), 1):
+        parts.append(f"**{idx}. {candidate_name}**\n")
+        if docs[0].metadata.get("email"):
+            parts.append(f"📧 Email: {docs[0].metadata.get('email')}\n")
+        parts.append("📄 Relevant sections:\n")
+        parts.extend(
+            f"  {i}. {snippet_preview(doc)}...\n\n" for i, doc in enumerate(docs[:MAX_CHUNKS_PER_CANDIDATE], 1)
+        )
+    return "".join(parts)
+
+
+def embed_queries(queries: List[str]) -> List[List[float]]:
+    """
+    Embed search queries, batching every query not already cached into one call.
+    Vectors are kept per session (most recent QUERY_EMBEDDING_CACHE_SIZE queries),
+    so repeated questions and widened searches don't re-run the embedding model.
+    """
+    cache = st.session_state.query_embeddings
+    missing = list(dict.fromkeys(q for q in queries if q not in cache))
+    if missing:
+        embeddings = initialize_embeddings()
+        if len(missing) == 1:
+            vectors = [embeddings.embed_query(missing[0])]
+        else:
+            vectors = embeddings.embed_documents(missing)
+        for query, vector in zip(missing, vectors):
+            cache[query] = vector
+        while len(cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            del cache[next(iter(cache))]
+    return [cache[q] for q in queries]
+
+
+def query_vector_store(query: str, k: int = RETRIEVAL_K, previous_query: Optional[str] = None) -> List[Document]:
     """
     Query vector store and return relevant documents.
     Ensures diversity by getting documents from different candidates.
+    
+    For a follow-up question, the question is also searched together with the
+    previous one (so "what about their education?" finds the same candidates),
+    both in one batched FAISS call, and the two rankings are fused with
+    reciprocal rank fusion.
     """
     if st.session_state.vector_store is None:
         return []
     
-    # Get more results than needed to ensure diversity
-    results = st.session_state.vector_store.similarity_search_with_score(query, k=k*2)
-    
-    # Filter to ensure we get documents from different candidates
-    unique_candidates = {}
-    diverse_results = []
-    
-    for doc, score in results:
-        candidate_id = doc.metadata.get("name", doc.metadata.get("filename", "Unknown"))
-        
-        # Limit chunks per candidate to ensure diversity
-        if candidate_id not in unique_candidates:
-            unique_candidates[candidate_id] = []
-        
-        if len(unique_candidates[candidate_id]) < 3:  # Max 3 chunks per candidate
-            unique_candidates[candidate_id].append((doc, score))
-            diverse_results.append((doc, score))
+    # Repeated questions (ignoring case and surrounding spaces) skip embedding and search
+    cache_key = (query.strip().lower(), (previous_query or "").strip().lower(), k)
+    cached = st.session_state.query_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+    
+    # Embed once, in one batch; widening the search below reuses the same vectors
+    queries = [query]
+    if previous_query and previous_query.strip().lower() != cache_key[0]:
+        queries.append(f"{query} {previous_query}")
+    query_vectors = embed_queries(queries)
+    
+    # Start with exactly k results and widen the search only if the per-candidate
+    # cap leaves us short (at most 4k, when few candidates dominate the matches).
+    # Flat indexes scan every vector whatever k is, so they fetch 4k in one search
+    # rather than rescanning the whole collection on each widening step.
+    fetch_k = k * 4 if is_flat_index(st.session_state.vector_store) else k
+    while True:
+        rankings = search_by_vectors(st.session_state.vector_store, query_vectors, fetch_k)
+        if len(rankings) == 1:
+            results = rankings[0]
+        else:
+            results = fuse_rankings(rankings)
+        
+        chunks_per_candidate = Counter()
+        fingerprints = defaultdict(list)
+        diverse_results = []
+        for doc, _ in results:
+            candidate = candidate_id(doc.metadata)
+            if chunks_per_candidate[candidate] >= MAX_CHUNKS_PER_CANDIDATE:
+                continue
+            # Skip near-duplicates of a better match; stores saved before fingerprints
+            # were added at ingestion compute them here
+            fingerprint = doc.metadata.get("simhash")
+            if fingerprint is None:
+                fingerprint = simhash(doc.page_content)
+            if any(bin(fingerprint ^ seen).count("1") <= SIMHASH_DUPLICATE_BITS for seen in fingerprints[candidate]):
+                continue
+            fingerprints[candidate].append(fingerprint)
+            chunks_per_candidate[candidate] += 1
+            diverse_results.append(doc)
+            if len(diverse_results) >= k:
+                break
         
-        if len(diverse_results) >= k:
+        if len(diverse_results) >= k or len(rankings[0]) < fetch_k or fetch_k >= k * 4:
             break
+        fetch_k *= 2
+    
+    # Hits come best-first (from FAISS, or by fused score) and the loop above keeps
+    # that order, so the diverse results need no re-sorting
+    docs = diverse_results
+    st.session_state.query_cache.put(cache_key, docs)
+    return list(docs)
+
+
+def fuse_rankings(rankings: List[List[tuple]]) -> List[tuple]:
+    """
+    Merge several best-first (document, score) rankings with reciprocal rank fusion,
+    scoring each document sum(1 / (RRF_K + rank)) over the rankings it appears in.
     
-    # Sort by score and return documents
-    diverse_results.sort(key=lambda x: x[1], reverse=False)  # Lower score = better match
-    return [doc for doc, score in diverse_results[:k]]
+    Returns:
+        (document, fused score) pairs, best first
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, (doc, _) in enumerate(ranking, 1):
+            key = getattr(doc, "id", None) or id(doc)
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = [doc, 1.0 / (RRF_K + rank)]
+            else:
+                entry[1] += 1.0 / (RRF_K + rank)
+    # Stable sort keeps first-seen order for ties
+    return sorted((tuple(entry) for entry in fused.values()), key=itemgetter(1), reverse=True)
 
 
-def filter_candidates(name_filter: str = "", skill_filter: str = "") -> List[Dict]:
-    """Filter candidates by name or skill."""
-    candidates = st.session_state.metadata_list.copy()
+def filter_candidates(name_filter: str = "", skill_filter: str = "",
+                      experience_range: Optional[tuple] = None, education: str = "") -> List[Dict]:
+    """
+    Filter candidates in one short-circuiting pass over metadata_list, or for large
+    lists with one boolean mask over the cached metadata DataFrame.
+    
+    Args:
+        name_filter: Case-insensitive substring of the candidate name
+        skill_filter: Case-insensitive substring of any of the candidate's skills
+        experience_range: Inclusive (min, max) years of experience
+        education: Exact education level
+        
+    Returns:
+        Matching metadata dicts, in upload order
+    """
+    import numpy as np
+    
+    metadata_list = st.session_state.metadata_list
+    name_lower = name_filter.lower()
+    skill_lower = skill_filter.lower()
+    
+    if len(metadata_list) < FILTER_VECTORIZED_MIN:
+        _refresh_metadata_cache()
+        search_text = st.session_state["_metadata_search_text"]
+        
+        def matches(i: int, candidate: Dict) -> bool:
+            candidate_name, candidate_skills = search_text[i]
+            if name_lower and name_lower not in candidate_name:
+                return False
+            if skill_lower and skill_lower not in candidate_skills:
+                return False
+            if experience_range is not None:
+                years = candidate.get("years_experience") or 0
+                if not experience_range[0] <= years <= experience_range[1]:
+                    return False
+            if education and (candidate.get("education_level") or "").strip() != education:
+                return False
+            return True
+        
+        return [candidate for i, candidate in enumerate(metadata_list) if matches(i, candidate)]
+    
+    df = get_metadata_df()
+    mask = np.ones(len(df), dtype=bool)
     
     if name_filter:
-        name_lower = name_filter.lower()
-        candidates = [c for c in candidates if name_lower in c.get("name", "").lower()]
+        mask &= df["name_lower"].str.contains(name_lower, regex=False).to_numpy()
     
     if skill_filter:
-        skill_lower = skill_filter.lower()
-        candidates = [
-            c for c in candidates
-            if any(skill_lower in skill.lower() for skill in c.get("skills", []))
-        ]
+        mask &= df["skills_text"].str.contains(skill_lower, regex=False).to_numpy()
+    
+    if experience_range is not None:
+        mask &= df["years_experience"].between(*experience_range).to_numpy()
+    
+    if education:
+        mask &= (df["education_level"] == education).to_numpy()
+    
+    return [metadata_list[i] for i in np.flatnonzero(mask)]
+
+
+def build_candidate_card_html(candidate: Dict) -> str:
+    """
+    Build the sidebar card for one candidate as a native <details> element.
+    Resume-derived text is HTML-escaped since the card is rendered with unsafe_allow_html.
+    """
+    esc = html.escape
+    name = candidate.get('name', candidate.get('filename', 'Unknown')) or ""
+    exp_years = candidate.get('years_experience', 0)
+    
+    parts = [
+        f"<details class='rag-cand'><summary>📄 {esc(name[:30])}{'...' if len(name) > 30 else ''}</summary>",
+        "<div class='rag-cand-grid'>",
+        f"<div><strong>📧 Email:</strong><br>{esc(candidate.get('email') or 'N/A')}</div>",
+        f"<div><strong>📊 Experience:</strong><br>{f'{exp_years} yrs' if exp_years > 0 else 'N/A'}</div>",
+        f"<div><strong>📞 Phone:</strong><br>{esc(candidate.get('phone') or 'N/A')}</div>",
+        f"<div><strong>🎓 Education:</strong><br>{esc(candidate.get('education_level') or 'N/A')}</div>",
+        "</div>"
+    ]
+    
+    skills = candidate.get('skills', [])
+    if skills:
+        parts.append(f"<div><strong>🛠️ Skills:</strong> {len(skills)}</div>")
+        parts.append(f"<div class='rag-cand-caption'>{esc(', '.join(skills[:5]))}{'...' if len(skills) > 5 else ''}</div>")
+    
+    if candidate.get('job_titles'):
+        parts.append(f"<div><strong>💼 Title:</strong> {esc(', '.join(candidate['job_titles'][:2]))}</div>")
+    if candidate.get('companies'):
+        parts.append(f"<div><strong>🏢 Company:</strong> {esc(', '.join(candidate['companies'][:2]))}</div>")
+    if candidate.get('location'):
+        parts.append(f"<div><strong>📍 Location:</strong> {esc(candidate['location'])}</div>")
+    if candidate.get('certifications'):
+        parts.append(f"<div><strong>🏆 Certifications:</strong> {esc(', '.join(candidate['certifications'][:3]))}</div>")
+    
+    parts.append(f"<div class='rag-cand-caption'>📁 File: {esc(candidate.get('filename') or 'N/A')}</div>")
+    parts.append("</details>")
+    # No newlines: a blank line would end the HTML block in Streamlit's markdown parser
+    return "".join(parts)
+
+
+# Defaults for metadata fields (older pickled metadata may be missing newer keys)
+_METADATA_DEFAULTS = {
+    "filename": "",
+    "name": "",
+    "email": "",
+    "phone": "",
+    "skills": [],
+    "years_experience": 0,
+    "education_level": "",
+    "job_titles": [],
+    "companies": [],
+    "location": "",
+    "certifications": []
+}
+
+
+def get_metadata_df() -> "pd.DataFrame":
+    """
+    Build a DataFrame of candidate metadata, cached in session state.
+    Rebuilt only when metadata_list is replaced or grows.
+    """
+    _refresh_metadata_cache()
+    return st.session_state["_metadata_df"]
+
+
+def get_metadata_signature() -> str:
+    """Content hash of metadata_list, used as the key for st.cache_data analytics."""
+    _refresh_metadata_cache()
+    return st.session_state["_metadata_sig"]
+
+
+def _refresh_metadata_cache():
+    """Rebuild the metadata DataFrame and signature if metadata_list changed."""
+    import pandas as pd
+    
+    metadata_list = st.session_state.metadata_list
+    cache_key = (id(metadata_list), len(metadata_list))
+    
+    if st.session_state.get("_metadata_df_key") != cache_key:
+        df = pd.DataFrame([{**_METADATA_DEFAULTS, **candidate} for candidate in metadata_list],
+                          columns=list(_METADATA_DEFAULTS))
+        df["years_experience"] = pd.to_numeric(df["years_experience"], errors="coerce").fillna(0)
+        for column in ("name", "email", "phone", "location", "filename"):
+            df[column] = df[column].fillna("")
+        # Education repeats a handful of levels, so store it as categorical codes with
+        # the known levels first (in standard order), then any others as first seen
+        education = df["education_level"].fillna("").str.strip()
+        df["education_level"] = pd.Categorical(
+            education, categories=list(dict.fromkeys(chain(_EDUCATION_ORDER, education)))
+        )
+        # List lengths are taken once per metadata change instead of on every analytics pass
+        for column in ("skills", "certifications", "job_titles", "companies"):
+            df[f"{column}_count"] = df[column].str.len().fillna(0).astype("int16")
+        # Lowercased search columns for filter_candidates, so filtering only runs the
+        # substring scan. Skills are newline-joined so a match can never span two
+        # skills (the filter is single-line).
+        df["name_lower"] = df["name"].str.lower()
+        df["skills_text"] = df["skills"].str.join("\n").fillna("").str.lower()
+        # The same two columns as plain (name, skills) tuples for the small-list filter path
+        st.session_state["_metadata_search_text"] = list(zip(df["name_lower"], df["skills_text"]))
+        st.session_state["_metadata_df"] = df
+        st.session_state["_metadata_sig"] = hashlib.blake2b(
+            json.dumps(metadata_list, sort_keys=True, default=str).encode("utf-8"),
+            digest_size=16
+        ).hexdigest()
+        st.session_state["_metadata_df_key"] = cache_key
+
+
+def _compute_display_names(df: "pd.DataFrame") -> tuple:
+    """
+    Validate candidate names in one vectorized pass.
+    
+    Returns:
+        Aligned Series: stripped names, valid-name mask, and display names
+        (the name if valid, otherwise the filename)
+    """
+    names = df["name"].str.strip()
+    valid_names = (names.str.len() >= 3) & ~names.str.contains(_INVALID_NAME_RE)
+    display_names = names.where(valid_names, df["filename"].replace("", "Unknown"))
+    return names, valid_names, display_names
+
+
+def clear_analytics_cache():
+    """Remove the current metadata's cached analytics, leaving other sessions' entries alone."""
+    metadata_sig = get_metadata_signature()
+    for cached_func in (_compute_quick_stats, _compute_analytics):
+        try:
+            cached_func.clear(metadata_sig, None)
+        except TypeError:
+            # Streamlit releases before per-key clearing; the TTL expires the entry instead
+            pass
+
+
+@st.cache_data(show_spinner=False, ttl=ANALYTICS_CACHE_TTL, max_entries=ANALYTICS_CACHE_ENTRIES)
+def _compute_quick_stats(metadata_sig: str, _df: "pd.DataFrame") -> Dict:
+    """
+    Sidebar counts, cached on the metadata signature. Kept apart from
+    _compute_analytics so each rerun of the sidebar only copies three ints
+    out of the cache rather than the whole analytics payload.
+    """
+    return {
+        "total_skills": int(_df["skills_count"].sum()),
+        "with_emails": int(_df["email"].astype(bool).sum()),
+        "with_phones": int(_df["phone"].astype(bool).sum())
+    }
+
+
+@st.cache_data(show_spinner=False, ttl=ANALYTICS_CACHE_TTL, max_entries=ANALYTICS_CACHE_ENTRIES)
+def _compute_analytics(metadata_sig: str, _df: "pd.DataFrame") -> Dict:
+    """
+    Compute the data behind the analytics dashboard.
+    Cached on the metadata signature so Streamlit reruns skip recomputation
+    until the uploaded candidates actually change.
+    """
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    
+    # Counts are int16 and scores float32, halving the bytes every reduction touches
+    skills_len = _df["skills_count"]
+    
+    # One valid-name mask shared by completeness, ranking and the candidate table
+    _, valid_names, display_names = _compute_display_names(_df)
+    
+    # Score each profile on four boolean columns: valid name, email, phone, skills
+    completeness_flags = pd.DataFrame({
+        "name": valid_names,
+        "email": _df["email"].astype(bool),
+        "phone": _df["phone"].astype(bool),
+        "skills": skills_len > 0
+    })
+    completeness_scores = completeness_flags.sum(axis=1)
+    
+    # Only the columns the chart and stats read; the frame is pickled to label the chart
+    completeness_df = pd.DataFrame({
+        "Candidate": display_names,
+        "Completeness Score": completeness_scores.astype("int8")
+    }).sort_values("Completeness Score", ascending=False, kind="stable")
+    
+    # Categorize skills
+    skills_dist = dict(Counter(chain.from_iterable(_df["skills"])))
+    categorized_skills = {cat: [] for cat in _SKILL_CATEGORIES}
+    
+    for skill, count in skills_dist.items():
+        skill_lower = skill.lower()
+        category = next((cat for kw, cat in _KEYWORD_TO_CATEGORY.items() if kw in skill_lower), "Other")
+        categorized_skills[category].append((skill, count))
+    
+    # Bucket experience into (0, 2], (2, 5], (5, 10], (10, inf) years in one vectorized pass
+    experience = _df.loc[_df["years_experience"] > 0, "years_experience"].to_numpy(dtype=float)
+    experience_levels = np.bincount(
+        np.searchsorted([2, 5, 10], experience, side="left"), minlength=4
+    ).tolist()
+    
+    # Education levels: known levels in standard order, then any others by count.
+    # value_counts on the categorical codes returns counts in category order.
+    education_counts = _df["education_level"].value_counts(sort=False)
+    education_counts = education_counts[education_counts > 0]
+    education_counts.index = [level or "Not Specified" for level in education_counts.index]
+    known_levels = education_counts.reindex(_EDUCATION_ORDER).dropna().astype(int)
+    other_levels = education_counts.drop(known_levels.index).sort_values(ascending=False, kind="stable")
+    
+    # Fit Score (0-100), see utils.compute_fit_scores for the point breakdown
+    has_email = _df["email"].astype(bool)
+    has_phone = _df["phone"].astype(bool)
+    has_education = _df["education_level"] != ""
+    years = _df["years_experience"].clip(lower=0).astype("float32")
+    certs_len = _df["certifications_count"]
+    fit_scores = pd.Series(compute_fit_scores(
+        valid_names, has_email, has_phone, skills_len, years, has_education, certs_len
+    ), index=_df.index, dtype="float32")
+    check = pd.Series("✗", index=_df.index)
+    ranked_df = pd.DataFrame({
+        "Candidate": display_names,
+        "Fit Score": fit_scores.round(1),
+        "Max Score": np.int16(100),
+        "Experience": years.map("{:g} years".format).where(years > 0, "N/A"),
+        "Education": _df["education_level"].cat.rename_categories({"": "N/A"}),
+        "Skills": skills_len.astype(str) + " skills",
+        "Certs": certs_len.astype(str) + " certs",
+        "Contact": check.mask(has_email, "✓") + " " + check.mask(has_phone, "✓")
+    }).sort_values("Fit Score", ascending=False, ignore_index=True)
+    
+    # Candidate details table, built column-wise
+    titles_len = _df["job_titles_count"]
+    companies_len = _df["companies_count"]
+    candidates_df = pd.DataFrame({
+        "Name": display_names,
+        "Email": _df["email"],
+        "Phone": _df["phone"],
+        "Experience": years.map("{:g} yrs".format).where(years > 0, "N/A"),
+        "Education": _df["education_level"],
+        "Job Title": _df["job_titles"].str[:2].str.join(", ").where(titles_len > 0, "N/A"),
+        "Company": _df["companies"].str[:2].str.join(", ").where(companies_len > 0, "N/A"),
+        "Location": _df["location"],
+        "Skills Count": skills_len,
+        "Skills": _df["skills"].str[:5].str.join(", ") + np.where(skills_len > 5, "...", ""),
+        "Certifications": _df["certifications"].str.join(", ").where(certs_len > 0, "N/A"),
+        "Filename": _df["filename"]
+    })
+    completeness_details = pd.concat([display_names.rename("Candidate"), completeness_flags], axis=1)
+    
+    return {
+        "total_skills": int(skills_len.sum()),
+        "with_emails": int(_df["email"].astype(bool).sum()),
+        "with_phones": int(_df["phone"].astype(bool).sum()),
+        "skills_dist": skills_dist,
+        "top_skills": heapq.nlargest(20, skills_dist.items(), key=itemgetter(1)),
+        "completeness_df": completeness_df,
+        # Arrow tables for st.dataframe, converted once per metadata signature
+        # instead of on every rerun
+        "completeness_table": pa.Table.from_pandas(completeness_details, preserve_index=False),
+        "avg_completeness": completeness_df["Completeness Score"].mean() if not completeness_df.empty else 0,
+        "perfect_profiles": int((completeness_df["Completeness Score"] == 4).sum()),
+        "incomplete_profiles": int((completeness_df["Completeness Score"] < 4).sum()),
+        "categorized_skills": categorized_skills,
+        "category_counts": {cat: len(skills) for cat, skills in categorized_skills.items() if skills},
+        "experience_data": experience.tolist(),
+        "avg_experience": float(experience.mean()) if experience.size else 0,
+        # Per-candidate breakdown and formula text, joined once per metadata change
+        "experience_details": "\n".join(
+            f"- Candidate {i}: **{years} years**" for i, years in enumerate(experience.tolist(), 1)
+        ),
+        "experience_formula": " + ".join(map(str, experience.tolist())),
+        "experience_levels": experience_levels,
+        "education_counts": list(pd.concat([known_levels, other_levels]).items()),
+        "title_counts": _count_list_column(_df["job_titles"], strip=True, top=15),
+        "company_counts": _count_list_column(_df["companies"], top=10),
+        "cert_counts": _count_list_column(_df["certifications"]),
+        "ranked_df": ranked_df,
+        "avg_fit_score": float(ranked_df["Fit Score"].mean()) if not ranked_df.empty else 0,
+        "high_fit_count": int((ranked_df["Fit Score"] >= 75).sum()),
+        "valid_names_count": int(((candidates_df["Name"] != "Unknown") & (candidates_df["Name"] != candidates_df["Filename"])).sum()),
+        "ranking_table": pa.Table.from_pandas(
+            ranked_df[["Candidate", "Fit Score", "Experience", "Education", "Skills", "Certs", "Contact"]],
+            preserve_index=False
+        ),
+        "candidates_table": pa.Table.from_pandas(candidates_df, preserve_index=False),
+        "location_counts": Counter(_df["location"][_df["location"] != ""]).most_common(10)
+    }
+
+
+def _count_list_column(column: "pd.Series", strip: bool = False, top: Optional[int] = None) -> List[tuple]:
+    """Count values across a column of lists, most frequent first (ties keep first-seen order)."""
+    values = chain.from_iterable(column)
+    if strip:
+        values = filter(None, (value.strip() for value in values))
+    # most_common(top) does a heap selection in C instead of sorting every distinct value
+    return Counter(values).most_common(top)
+
+
+# Chart kind -> key of its input data in the _compute_analytics result
+_FIGURE_DATA_KEYS = {
+    "skills": "top_skills",
+    "completeness": "completeness_df",
+    "categories": "category_counts",
+    "experience": "experience_data",
+    "education": "education_counts",
+    "titles": "title_counts",
+    "companies": "company_counts",
+    "certs": "cert_counts",
+    "ranking": "ranked_df",
+    "locations": "location_counts",
+}
+
+
+# Charts whose layout does not depend on their data, so new data can be swapped
+# into the existing traces instead of building a new Figure
+_UPDATABLE_FIGURES = ("completeness", "categories", "experience", "education", "ranking")
+
+
+def _build_analytics_figures(stats: Dict) -> Dict:
+    """
+    Return the Plotly figures for the analytics dashboard, one per chart with data.
+    Each chart is labelled with a hash of its own input data, so after a new upload
+    only the charts whose data actually changed are rebuilt, and charts in
+    _UPDATABLE_FIGURES only have their trace data replaced.
+    """
+    import plotly.graph_objects as go
+    
+    # Session-owned figures: (label, Figure) per chart. The _build_figure cache is
+    # shared across sessions, so only copies kept here are updated in place.
+    session_figures = st.session_state.setdefault("_analytics_figures", {})
+    figures = {}
+    for kind, data_key in _FIGURE_DATA_KEYS.items():
+        data = stats[data_key]
+        if len(data) == 0:
+            continue
+        label = hashlib.blake2b(pickle.dumps((kind, data)), digest_size=16).hexdigest()
+        previous = session_figures.get(kind)
+        if previous is not None and previous[0] == label:
+            fig = previous[1]
+        elif previous is not None and kind in _UPDATABLE_FIGURES:
+            fig = previous[1]
+            with fig.batch_update():
+                _update_figure_data(kind, fig, data)
+        else:
+            fig = _build_figure(kind, label, data)
+            if kind in _UPDATABLE_FIGURES:
+                fig = go.Figure(fig)
+        if kind in _UPDATABLE_FIGURES:
+            session_figures[kind] = (label, fig)
+        figures[kind] = fig
+    return figures
+
+
+def _update_figure_data(kind: str, fig, data) -> None:
+    """Replace the trace data of a chart built by _build_figure, keeping its layout."""
+    import numpy as np
+    import plotly.express as px
+    
+    trace = fig.data[0]
+    if kind == "categories":
+        trace.labels = list(data.keys())
+        trace.values = list(data.values())
+    elif kind == "experience":
+        trace.x = data
+    elif kind == "education":
+        trace.labels = [level for level, _ in data]
+        trace.values = [count for _, count in data]
+        fig.layout.piecolorway = px.colors.qualitative.Set3[:len(data)]
+    elif kind == "completeness":
+        scores = data["Completeness Score"].to_numpy()
+        trace.x = data["Candidate"].to_numpy()
+        trace.y = scores
+        trace.text = scores
+        trace.marker.color = scores
+    elif kind == "ranking":
+        scores = data["Fit Score"].to_numpy(dtype=np.float32)
+        trace.x = data["Candidate"].to_numpy()
+        trace.y = scores
+        trace.marker.color = scores
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _build_figure(kind: str, label: str, _data):
+    """Build one analytics chart; cached on its data label so reruns reuse the Figure."""
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
+    data = _data
+    if kind == "skills":
+        # Top Skills Bar Chart
+        skills_df = pd.DataFrame(data, columns=["Skill", "Count"])
+        
+        fig = px.bar(
+            skills_df,
+            x="Count",
+            y="Skill",
+            orientation='h',
+            title="Top 20 Skills Distribution",
+            labels={"Count": "Number of Candidates", "Skill": "Skill Name"},
+            color="Count",
+            color_continuous_scale="Blues",
+            text="Count"
+        )
+        fig.update_traces(textposition='outside')
+        fig.update_layout(
+            height=600,
+            yaxis={'categoryorder': 'total ascending'},
+            xaxis_title="Number of Candidates",
+            yaxis_title="",
+            showlegend=False,
+            autosize=True
+        )
+        return fig
+    
+    if kind == "completeness":
+        # One bar per candidate, so built with graph_objects on NumPy arrays like the
+        # ranking chart; the color scale is pinned to 0-4 so new data can be swapped in
+        scores = data["Completeness Score"].to_numpy()
+        fig = go.Figure(go.Bar(
+            x=data["Candidate"].to_numpy(),
+            y=scores,
+            text=scores,
+            textposition='outside',
+            marker=dict(
+                color=scores,
+                cmin=0,
+                cmax=4,
+                colorscale=["#ff4444", "#ffaa00", "#ffdd00", "#88ff00", "#00ff00"],
+                colorbar=dict(title="Score (out of 4)")
+            ),
+            hovertemplate="Candidate Name=%{x}<br>Score (out of 4)=%{y}<extra></extra>"
+        ))
+        fig.update_layout(
+            title="Candidate Profile Completeness Score",
+            height=500,
+            xaxis_tickangle=-45,
+            xaxis_title="",
+            yaxis_title="Completeness Score (out of 4)",
+            showlegend=False,
+            autosize=True
+        )
+        return fig
+    
+    if kind == "categories":
+        fig_pie = px.pie(
+            values=list(data.values()),
+            names=list(data.keys()),
+            title="Skills by Category Distribution",
+            hole=0.4
+        )
+        fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+        fig_pie.update_layout(height=400, autosize=True)
+        return fig_pie
+    
+    if kind == "experience":
+        # Experience histogram
+        exp_df = pd.DataFrame({"Years of Experience": data})
+        fig = px.histogram(
+            exp_df,
+            x="Years of Experience",
+            nbins=10,
+            title="Years of Experience Distribution",
+            labels={"Years of Experience": "Years", "count": "Number of Candidates"},
+            color_discrete_sequence=['#1f77b4']
+        )
+        fig.update_layout(height=400, showlegend=False, autosize=True)
+        return fig
+    
+    if kind == "education":
+        edu_df = pd.DataFrame(data, columns=["Education Level", "Count"])
+        
+        # Use colors that work well with dark theme
+        colors = px.colors.qualitative.Set3[:len(data)]
+        
+        fig = px.pie(
+            edu_df,
+            values="Count",
+            names="Education Level",
+            title="Education Distribution",
+            hole=0.4,
+            color_discrete_sequence=colors
+        )
+        fig.update_traces(
+            textposition='inside', 
+            textinfo='percent+label',
+            hovertemplate='<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>'
+        )
+        fig.update_layout(
+            height=400, 
+            autosize=True,
+            font=dict(color='#fafafa'),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            title_font=dict(color='#4fc3f7', size=16)
+        )
+        return fig
+    
+    if kind == "titles":
+        titles_df = pd.DataFrame(data, columns=["Job Title", "Count"])
+        fig = px.bar(
+            titles_df,
+            x="Count",
+            y="Job Title",
+            orientation='h',
+            title="Top 15 Job Titles",
+            labels={"Count": "Number of Candidates", "Job Title": ""},
+            color="Count",
+            color_continuous_scale="Viridis"
+        )
+        fig.update_layout(
+            height=500,
+            yaxis={'categoryorder': 'total ascending'},
+            showlegend=False,
+            autosize=True
+        )
+        return fig
+    
+    if kind == "companies":
+        companies_df = pd.DataFrame(data, columns=["Company", "Count"])
+        fig = px.bar(
+            companies_df,
+            x="Company",
+            y="Count",
+            title="Top Companies (Previous Employers)",
+            labels={"Count": "Number of Candidates", "Company": "Company Name"},
+            color="Count",
+            color_continuous_scale="Blues"
+        )
+        fig.update_layout(height=400, xaxis_tickangle=-45, showlegend=False, autosize=True)
+        return fig
+    
+    if kind == "certs":
+        certs_df = pd.DataFrame(data, columns=["Certification", "Count"])
+        fig = px.bar(
+            certs_df,
+            x="Certification",
+            y="Count",
+            title="Certifications Distribution",
+            labels={"Count": "Number of Candidates", "Certification": "Certification Name"},
+            color="Count",
+            color_continuous_scale="Greens"
+        )
+        fig.update_layout(height=400, xaxis_tickangle=-45, showlegend=False, autosize=True)
+        return fig
+    
+    if kind == "ranking":
+        # Built with graph_objects on NumPy arrays (one row per candidate, so the
+        # largest chart) to skip Plotly Express's per-column DataFrame processing
+        scores = data["Fit Score"].to_numpy(dtype=np.float32)
+        fig = go.Figure(go.Bar(
+            x=data["Candidate"].to_numpy(),
+            y=scores,
+            texttemplate="%{y:.1f}",
+            textposition='outside',
+            marker=dict(
+                color=scores,
+                colorscale=["#ff4444", "#ffaa00", "#88ff00", "#00ff00"],
+                colorbar=dict(title="Fit Score")
+            ),
+            hovertemplate="Candidate Name=%{x}<br>Fit Score=%{y:.1f}<extra></extra>"
+        ))
+        fig.update_layout(
+            title="Candidate Fit Score Ranking (0-100)",
+            xaxis_title="Candidate Name",
+            yaxis_title="Fit Score",
+            height=500,
+            xaxis_tickangle=-45,
+            yaxis_range=[0, 100],
+            showlegend=False,
+            autosize=True
+        )
+        return fig
+    
+    if kind == "locations":
+        loc_df = pd.DataFrame(data, columns=["Location", "Count"])
+        fig = px.bar(
+            loc_df,
+            x="Location",
+            y="Count",
+            title="Top Candidate Locations",
+            labels={"Count": "Number of Candidates", "Location": "City, State"},
+            color="Count",
+            color_continuous_scale="Purples"
+        )
+        fig.update_layout(height=400, xaxis_tickangle=-45, showlegend=False, autosize=True)
+        return fig
     
-    return candidates
+    raise ValueError(f"Unknown chart kind: {kind}")
 
 
 def show_analytics():
     """Display enhanced analytics dashboard with detailed insights."""
-    if not st.session_state.metadata_list:
+    metadata_list = st.session_state.metadata_list
+    if not metadata_list:
         st.info("📤 Upload resumes to see analytics.")
         return
     
-    total_count = len(st.session_state.metadata_list)
+    total_count = len(metadata_list)
+    metadata_sig = get_metadata_signature()
+    stats = _compute_analytics(metadata_sig, get_metadata_df())
+    skills_dist = stats["skills_dist"]
+    top_skills = stats["top_skills"]
+    figures = _build_analytics_figures(stats)
     
     # Header with summary
     st.markdown("## 📊 Analytics Dashboard")
@@ -392,7 +1510,7 @@ def show_analytics():
         )
     
     with col2:
-        total_skills = sum(len(c.get("skills", [])) for c in st.session_state.metadata_list)
+        total_skills = stats["total_skills"]
         avg_skills = total_skills / total_count if total_count > 0 else 0
         st.metric(
             label="🛠️ Avg Skills",
@@ -401,7 +1519,7 @@ def show_analytics():
         )
     
     with col3:
-        with_emails = sum(1 for c in st.session_state.metadata_list if c.get("email"))
+        with_emails = stats["with_emails"]
         email_pct = (with_emails / total_count * 100) if total_count > 0 else 0
         st.metric(
             label="📧 With Email",
@@ -412,7 +1530,7 @@ def show_analytics():
         )
     
     with col4:
-        with_phones = sum(1 for c in st.session_state.metadata_list if c.get("phone"))
+        with_phones = stats["with_phones"]
         phone_pct = (with_phones / total_count * 100) if total_count > 0 else 0
         st.metric(
             label="📞 With Phone",
@@ -423,7 +1541,7 @@ def show_analytics():
         )
     
     with col5:
-        total_unique_skills = len(get_skills_distribution(st.session_state.metadata_list))
+        total_unique_skills = len(skills_dist)
         st.metric(
             label="🎯 Unique Skills",
             value=total_unique_skills,
@@ -434,217 +1552,79 @@ def show_analytics():
     
     # Skills Analysis Section - Mobile Responsive
     st.markdown("### 🛠️ Skills Analysis")
-    skills_dist = get_skills_distribution(st.session_state.metadata_list)
     
     if skills_dist:
         # Responsive columns: stack on mobile
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            # Top Skills Bar Chart
-            top_skills = sorted(skills_dist.items(), key=lambda x: x[1], reverse=True)[:20]
-            skills_df = pd.DataFrame(top_skills, columns=["Skill", "Count"])
-            
-            # Calculate percentage
-            skills_df["Percentage"] = (skills_df["Count"] / total_count * 100).round(1)
-            
-            fig = px.bar(
-                skills_df,
-                x="Count",
-                y="Skill",
-                orientation='h',
-                title="Top 20 Skills Distribution",
-                labels={"Count": "Number of Candidates", "Skill": "Skill Name"},
-                color="Count",
-                color_continuous_scale="Blues",
-                text="Count"
-            )
-            fig.update_traces(textposition='outside')
-            fig.update_layout(
-                height=600,
-                yaxis={'categoryorder': 'total ascending'},
-                xaxis_title="Number of Candidates",
-                yaxis_title="",
-                showlegend=False,
-                autosize=True
-            )
-            # Mobile responsive chart
-            st.plotly_chart(fig, width='stretch', config={'displayModeBar': True, 'responsive': True})
+            st.plotly_chart(figures["skills"], width='stretch', config={'displayModeBar': True, 'responsive': True})
         
         with col2:
             st.markdown("#### 📋 Top Skills List")
-            for idx, (skill, count) in enumerate(top_skills[:10], 1):
-                percentage = (count / total_count * 100)
-                st.markdown(f"""
-                **{idx}. {skill}**
-                - {count} candidate(s) ({percentage:.1f}%)
-                """)
+            # One markdown element per list instead of one per row
+            st.markdown("\n\n".join(
+                f"**{idx}. {skill}**\n- {count} candidate(s) ({count / total_count * 100:.1f}%)"
+                for idx, (skill, count) in enumerate(top_skills[:10], 1)
+            ))
             
             if len(top_skills) > 10:
                 with st.expander(f"View all {len(top_skills)} skills"):
-                    for idx, (skill, count) in enumerate(top_skills[10:], 11):
-                        percentage = (count / total_count * 100)
-                        st.markdown(f"**{idx}. {skill}** - {count} ({percentage:.1f}%)")
+                    st.markdown("\n\n".join(
+                        f"**{idx}. {skill}** - {count} ({count / total_count * 100:.1f}%)"
+                        for idx, (skill, count) in enumerate(top_skills[10:], 11)
+                    ))
     
     st.divider()
     
     # Candidate Completeness Section
     st.markdown("### ✅ Candidate Profile Completeness")
     
-    # Patterns that indicate invalid names
-    invalid_name_patterns = [
-        r'CERTIFICATE', r'RESUME', r'CV', r'CURRICULUM', r'VITAE',
-        r'APPLICATION', r'PAGE \d+', r'^\d+$',
-    ]
-    
-    completeness_data = []
-    completeness_details = []
+    completeness_df = stats["completeness_df"]
+    avg_completeness = stats["avg_completeness"]
+    perfect_profiles = stats["perfect_profiles"]
     
-    for candidate in st.session_state.metadata_list:
-        score = 0
-        details = {"name": False, "email": False, "phone": False, "skills": False}
-        name = candidate.get("name", "").strip()
-        
-        # Check if name is valid
-        is_valid_name = False
-        if name:
-            name_upper = name.upper()
-            is_valid_name = not any(re.search(pattern, name_upper) for pattern in invalid_name_patterns)
-            if len(name.split()) < 1 or len(name) < 3:
-                is_valid_name = False
-        
-        if is_valid_name:
-            score += 1
-            details["name"] = True
-        if candidate.get("email"):
-            score += 1
-            details["email"] = True
-        if candidate.get("phone"):
-            score += 1
-            details["phone"] = True
-        if candidate.get("skills") and len(candidate.get("skills", [])) > 0:
-            score += 1
-            details["skills"] = True
-        
-        display_name = name if is_valid_name else candidate.get("filename", "Unknown")
-        completeness_data.append({
-            "Candidate": display_name,
-            "Completeness Score": score,
-            "Max Score": 4,
-            "Percentage": (score / 4 * 100)
-        })
-        completeness_details.append({
-            "Candidate": display_name,
-            **details
-        })
-    
-    # Initialize variables for summary stats
-    completeness_df = None
-    avg_completeness = 0
-    perfect_profiles = 0
-    
-    if completeness_data:
-        completeness_df = pd.DataFrame(completeness_data)
-        completeness_df = completeness_df.sort_values("Completeness Score", ascending=False)
-        avg_completeness = completeness_df["Completeness Score"].mean()
-        perfect_profiles = len(completeness_df[completeness_df["Completeness Score"] == 4])
-        
+    if not completeness_df.empty:
         # Responsive columns
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            # Enhanced completeness chart - mobile responsive
-            fig = px.bar(
-                completeness_df,
-                x="Candidate",
-                y="Completeness Score",
-                title="Candidate Profile Completeness Score",
-                labels={"Candidate": "Candidate Name", "Completeness Score": "Score (out of 4)"},
-                color="Completeness Score",
-                color_continuous_scale=["#ff4444", "#ffaa00", "#ffdd00", "#88ff00", "#00ff00"],
-                text="Completeness Score"
-            )
-            fig.update_traces(textposition='outside')
-            fig.update_layout(
-                height=500,
-                xaxis_tickangle=-45,
-                xaxis_title="",
-                yaxis_title="Completeness Score (out of 4)",
-                showlegend=False,
-                autosize=True
-            )
-            st.plotly_chart(fig, width='stretch', config={'displayModeBar': True, 'responsive': True})
+            st.plotly_chart(figures["completeness"], width='stretch', config={'displayModeBar': True, 'responsive': True})
         
         with col2:
             st.markdown("#### 📊 Completeness Stats")
             st.metric("Average Score", f"{avg_completeness:.2f}/4.0")
             st.metric("Complete Profiles", f"{perfect_profiles}/{total_count}")
             
-            incomplete = len(completeness_df[completeness_df["Completeness Score"] < 4])
-            st.metric("Incomplete Profiles", f"{incomplete}/{total_count}")
+            st.metric("Incomplete Profiles", f"{stats['incomplete_profiles']}/{total_count}")
             
             st.divider()
             st.markdown("#### 📋 Details")
             with st.expander("View Completeness Details"):
-                details_df = pd.DataFrame(completeness_details)
-                st.dataframe(details_df, width='stretch', hide_index=True)
+                st.dataframe(stats["completeness_table"], width='stretch', hide_index=True)
     
     st.divider()
     
     # Skills Categories Analysis
     st.markdown("### 🎯 Skills Categories")
     
-    # Categorize skills
-    skill_categories = {
-        "Programming Languages": ["Python", "JavaScript", "Java", "C++", "C#", "TypeScript", "Go", "Rust", "Swift", "Kotlin", "PHP", "Ruby"],
-        "Web Frameworks": ["React", "Angular", "Vue", "Django", "Flask", "Node.js", "Spring", ".NET"],
-        "Databases": ["SQL", "MongoDB", "PostgreSQL", "MySQL"],
-        "Cloud & DevOps": ["AWS", "Docker", "Kubernetes", "Linux", "Git"],
-        "Machine Learning": ["Machine Learning", "Deep Learning", "TensorFlow", "PyTorch"],
-        "Frontend": ["HTML", "CSS"],
-        "Other": []
-    }
-    
-    categorized_skills = {cat: [] for cat in skill_categories.keys()}
-    
-    for skill, count in skills_dist.items():
-        categorized = False
-        for category, keywords in skill_categories.items():
-            if any(keyword.lower() in skill.lower() for keyword in keywords):
-                categorized_skills[category].append((skill, count))
-                categorized = True
-                break
-        if not categorized:
-            categorized_skills["Other"].append((skill, count))
-    
-    # Create pie chart for skill categories
-    category_counts = {cat: len(skills) for cat, skills in categorized_skills.items() if skills}
+    categorized_skills = stats["categorized_skills"]
+    category_counts = stats["category_counts"]
     
     if category_counts:
         # Responsive columns: stack on mobile
         col1, col2 = st.columns([1, 1])
         
         with col1:
-            fig_pie = px.pie(
-                values=list(category_counts.values()),
-                names=list(category_counts.keys()),
-                title="Skills by Category Distribution",
-                hole=0.4
-            )
-            fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-            fig_pie.update_layout(height=400, autosize=True)
-            st.plotly_chart(fig_pie, width='stretch', config={'displayModeBar': True, 'responsive': True})
+            st.plotly_chart(figures["categories"], width='stretch', config={'displayModeBar': True, 'responsive': True})
         
         with col2:
             st.markdown("#### 📊 Category Breakdown")
-            for category, skills_list in categorized_skills.items():
-                if skills_list:
-                    total_in_category = sum(count for _, count in skills_list)
-                    st.markdown(f"""
-                    **{category}**
-                    - {len(skills_list)} unique skill(s)
-                    - {total_in_category} total mentions
-                    """)
+            st.markdown("\n\n".join(
+                f"**{category}**\n- {len(skills_list)} unique skill(s)\n"
+                f"- {sum(count for _, count in skills_list)} total mentions"
+                for category, skills_list in categorized_skills.items() if skills_list
+            ))
     
     st.divider()
     
@@ -655,47 +1635,28 @@ def show_analytics():
     
     # Experience Level Distribution
     st.markdown("### 📊 Experience Level Distribution")
-    experience_data = []
-    for candidate in st.session_state.metadata_list:
-        years = candidate.get("years_experience", 0)
-        if years > 0:
-            experience_data.append(years)
+    experience_data = stats["experience_data"]
     
     if experience_data:
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            # Experience histogram
-            exp_df = pd.DataFrame({"Years of Experience": experience_data})
-            fig = px.histogram(
-                exp_df,
-                x="Years of Experience",
-                nbins=10,
-                title="Years of Experience Distribution",
-                labels={"Years of Experience": "Years", "count": "Number of Candidates"},
-                color_discrete_sequence=['#1f77b4']
-            )
-            fig.update_layout(height=400, showlegend=False, autosize=True)
-            st.plotly_chart(fig, width='stretch', config={'displayModeBar': True, 'responsive': True})
+            st.plotly_chart(figures["experience"], width='stretch', config={'displayModeBar': True, 'responsive': True})
         
         with col2:
             st.markdown("#### 📈 Experience Stats")
-            avg_exp = sum(experience_data) / len(experience_data) if experience_data else 0
+            avg_exp = stats["avg_experience"]
             st.metric("Average Experience", f"{avg_exp:.1f} years")
             
             # Show calculation breakdown
             with st.expander("🔍 Calculation Details", expanded=False):
                 st.markdown("**Individual Experience Values:**")
-                for i, years in enumerate(experience_data, 1):
-                    st.markdown(f"- Candidate {i}: **{years} years**")
-                st.markdown(f"\n**Calculation:** ({' + '.join(map(str, experience_data))}) ÷ {len(experience_data)} = **{avg_exp:.2f} years**")
+                st.markdown(stats["experience_details"])
+                st.markdown(f"\n**Calculation:** ({stats['experience_formula']}) ÷ {len(experience_data)} = **{avg_exp:.2f} years**")
                 st.caption(f"Displayed as: {avg_exp:.1f} years (rounded to 1 decimal)")
             
             # Categorize experience levels
-            entry_level = sum(1 for y in experience_data if 0 < y <= 2)
-            mid_level = sum(1 for y in experience_data if 2 < y <= 5)
-            senior_level = sum(1 for y in experience_data if 5 < y <= 10)
-            expert_level = sum(1 for y in experience_data if y > 10)
+            entry_level, mid_level, senior_level, expert_level = stats["experience_levels"]
             
             st.markdown(f"""
             **Experience Levels:**
@@ -751,52 +1712,14 @@ def show_analytics():
     
     # Education Level Breakdown
     st.markdown("### 🎓 Education Level Breakdown")
-    education_data = {}
-    for candidate in st.session_state.metadata_list:
-        edu = candidate.get("education_level", "")
-        # Normalize empty strings and handle "Not Specified"
-        if not edu or edu.strip() == "":
-            edu = "Not Specified"
-        education_data[edu] = education_data.get(edu, 0) + 1
+    sorted_data = stats["education_counts"]
+    education_data = dict(sorted_data)
     
     if education_data:
         col1, col2 = st.columns([1, 1])
         
         with col1:
-            # Sort education levels by standard order, then by count
-            education_order = ["PhD", "Master's", "Bachelor's", "Associate's", "Diploma", "Not Specified"]
-            sorted_data = sorted(
-                education_data.items(),
-                key=lambda x: (education_order.index(x[0]) if x[0] in education_order else 999, -x[1])
-            )
-            
-            edu_df = pd.DataFrame(sorted_data, columns=["Education Level", "Count"])
-            
-            # Use colors that work well with dark theme
-            colors = px.colors.qualitative.Set3[:len(education_data)]
-            
-            fig = px.pie(
-                edu_df,
-                values="Count",
-                names="Education Level",
-                title="Education Distribution",
-                hole=0.4,
-                color_discrete_sequence=colors
-            )
-            fig.update_traces(
-                textposition='inside', 
-                textinfo='percent+label',
-                hovertemplate='<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>'
-            )
-            fig.update_layout(
-                height=400, 
-                autosize=True,
-                font=dict(color='#fafafa'),
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                title_font=dict(color='#4fc3f7', size=16)
-            )
-            st.plotly_chart(fig, width='stretch', config={'displayModeBar': True, 'responsive': True})
+            st.plotly_chart(figures["education"], width='stretch', config={'displayModeBar': True, 'responsive': True})
         
         with col2:
             st.markdown("#### 📚 Education Details")
@@ -806,10 +1729,10 @@ def show_analytics():
             total_without_education = education_data.get("Not Specified", 0)
             
             # Show education levels first (in order)
-            for edu_level, count in sorted_data:
-                if edu_level != "Not Specified":
-                    percentage = (count / total_count * 100)
-                    st.markdown(f"**{edu_level}**: {count} candidate{'s' if count != 1 else ''} ({percentage:.1f}%)")
+            st.markdown("\n\n".join(
+                f"**{edu_level}**: {count} candidate{'s' if count != 1 else ''} ({count / total_count * 100:.1f}%)"
+                for edu_level, count in sorted_data if edu_level != "Not Specified"
+            ))
             
             # Show "Not Specified" separately if present
             if total_without_education > 0:
@@ -831,49 +1754,20 @@ def show_analytics():
     
     # Job Title Distribution
     st.markdown("### 💼 Job Title Distribution")
-    all_titles = []
-    for candidate in st.session_state.metadata_list:
-        titles = candidate.get("job_titles", [])
-        all_titles.extend(titles)
-    
-    if all_titles:
-        # Count full titles, not just first word
-        title_counts = {}
-        for title in all_titles:
-            title_normalized = title.strip()
-            if len(title_normalized) > 0:
-                title_counts[title_normalized] = title_counts.get(title_normalized, 0) + 1
-        
-        top_titles = sorted(title_counts.items(), key=lambda x: x[1], reverse=True)[:15]
-        
+    top_titles = stats["title_counts"]
+    
+    if top_titles:
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            titles_df = pd.DataFrame(top_titles, columns=["Job Title", "Count"])
-            fig = px.bar(
-                titles_df,
-                x="Count",
-                y="Job Title",
-                orientation='h',
-                title="Top 15 Job Titles",
-                labels={"Count": "Number of Candidates", "Job Title": ""},
-                color="Count",
-                color_continuous_scale="Viridis"
-            )
-            fig.update_layout(
-                height=500,
-                yaxis={'categoryorder': 'total ascending'},
-                showlegend=False,
-                autosize=True
-            )
-            st.plotly_chart(fig, width='stretch', config={'displayModeBar': True, 'responsive': True})
+            st.plotly_chart(figures["titles"], width='stretch', config={'displayModeBar': True, 'responsive': True})
         
         with col2:
             st.markdown("#### 💼 Top Titles")
-            for idx, (title, count) in enumerate(top_titles[:10], 1):
-                percentage = (count / total_count * 100)
-                st.markdown(f"**{idx}. {title}**")
-                st.markdown(f"   - {count} candidate{'s' if count != 1 else ''} ({percentage:.1f}%)")
+            st.markdown("\n\n".join(
+                f"**{idx}. {title}**\n- {count} candidate{'s' if count != 1 else ''} ({count / total_count * 100:.1f}%)"
+                for idx, (title, count) in enumerate(top_titles[:10], 1)
+            ))
     else:
         st.info("📋 **No job titles found**\n\nNo job titles were detected in the uploaded resumes. Titles are extracted from experience sections.")
     
@@ -881,40 +1775,20 @@ def show_analytics():
     
     # Top Companies
     st.markdown("### 🏛️ Previous Companies")
-    all_companies = []
-    for candidate in st.session_state.metadata_list:
-        companies = candidate.get("companies", [])
-        all_companies.extend(companies)
-    
-    if all_companies:
-        company_counts = {}
-        for company in all_companies:
-            company_counts[company] = company_counts.get(company, 0) + 1
-        
-        top_companies = sorted(company_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        
+    top_companies = stats["company_counts"]
+    
+    if top_companies:
         col1, col2 = st.columns([1, 1])
         
         with col1:
-            companies_df = pd.DataFrame(top_companies, columns=["Company", "Count"])
-            fig = px.bar(
-                companies_df,
-                x="Company",
-                y="Count",
-                title="Top Companies (Previous Employers)",
-                labels={"Count": "Number of Candidates", "Company": "Company Name"},
-                color="Count",
-                color_continuous_scale="Blues"
-            )
-            fig.update_layout(height=400, xaxis_tickangle=-45, showlegend=False, autosize=True)
-            st.plotly_chart(fig, width='stretch', config={'displayModeBar': True, 'responsive': True})
+            st.plotly_chart(figures["companies"], width='stretch', config={'displayModeBar': True, 'responsive': True})
         
         with col2:
             st.markdown("#### 🏢 Company List")
-            for idx, (company, count) in enumerate(top_companies, 1):
-                percentage = (count / total_count * 100)
-                st.markdown(f"**{idx}. {company}**")
-                st.markdown(f"   - {count} candidate(s) ({percentage:.1f}%)")
+            st.markdown("\n\n".join(
+                f"**{idx}. {company}**\n- {count} candidate(s) ({count / total_count * 100:.1f}%)"
+                for idx, (company, count) in enumerate(top_companies, 1)
+            ))
     else:
         st.info("📋 **No companies found**\n\nNo company names were detected in the uploaded resumes. Companies are extracted from experience sections.")
     
@@ -922,40 +1796,20 @@ def show_analytics():
     
     # Certifications
     st.markdown("### 🏆 Certifications & Credentials")
-    all_certs = []
-    for candidate in st.session_state.metadata_list:
-        certs = candidate.get("certifications", [])
-        all_certs.extend(certs)
-    
-    if all_certs:
-        cert_counts = {}
-        for cert in all_certs:
-            cert_counts[cert] = cert_counts.get(cert, 0) + 1
-        
-        top_certs = sorted(cert_counts.items(), key=lambda x: x[1], reverse=True)
-        
+    top_certs = stats["cert_counts"]
+    
+    if top_certs:
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            certs_df = pd.DataFrame(top_certs, columns=["Certification", "Count"])
-            fig = px.bar(
-                certs_df,
-                x="Certification",
-                y="Count",
-                title="Certifications Distribution",
-                labels={"Count": "Number of Candidates", "Certification": "Certification Name"},
-                color="Count",
-                color_continuous_scale="Greens"
-            )
-            fig.update_layout(height=400, xaxis_tickangle=-45, showlegend=False, autosize=True)
-            st.plotly_chart(fig, width='stretch', config={'displayModeBar': True, 'responsive': True})
+            st.plotly_chart(figures["certs"], width='stretch', config={'displayModeBar': True, 'responsive': True})
         
         with col2:
             st.markdown("#### 🎖️ Top Certifications")
-            for idx, (cert, count) in enumerate(top_certs[:10], 1):
-                percentage = (count / total_count * 100)
-                st.markdown(f"**{idx}. {cert}**")
-                st.markdown(f"   - {count} ({percentage:.1f}%)")
+            st.markdown("\n\n".join(
+                f"**{idx}. {cert}**\n- {count} ({count / total_count * 100:.1f}%)"
+                for idx, (cert, count) in enumerate(top_certs[:10], 1)
+            ))
     else:
         st.info("📋 **No certifications found**\n\nNo certifications were detected in the uploaded resumes.")
     
@@ -983,202 +1837,54 @@ def show_analytics():
         See `SCORING_EXPLANATION.md` for detailed documentation.
         """)
     
-    ranked_candidates = []
-    for candidate in st.session_state.metadata_list:
-        score = 0
-        details = {}
-        
-        # Name (10 points)
-        name = candidate.get("name", "").strip()
-        is_valid_name = False
-        if name:
-            name_upper = name.upper()
-            invalid_patterns = [r'CERTIFICATE', r'RESUME', r'CV', r'CURRICULUM', r'VITAE']
-            is_valid_name = not any(re.search(pattern, name_upper) for pattern in invalid_patterns)
-            if len(name.split()) < 1 or len(name) < 3:
-                is_valid_name = False
+    ranked_df = stats["ranked_df"]
+    
+    if not ranked_df.empty:
+        col1, col2 = st.columns([2, 1])
         
-        if is_valid_name:
-            score += 10
-            details["name"] = "✓"
-        else:
-            details["name"] = "✗"
-        
-        # Contact info (20 points)
-        if candidate.get("email"):
-            score += 10
-            details["email"] = "✓"
-        else:
-            details["email"] = "✗"
-        
-        if candidate.get("phone"):
-            score += 10
-            details["phone"] = "✓"
-        else:
-            details["phone"] = "✗"
-        
-        # Skills (20 points)
-        skills_count = len(candidate.get("skills", []))
-        if skills_count > 0:
-            score += min(20, skills_count * 2)  # 2 points per skill, max 20
-            details["skills"] = f"{skills_count} skills"
-        else:
-            details["skills"] = "0 skills"
-        
-        # Experience (25 points)
-        years_exp = candidate.get("years_experience", 0)
-        if years_exp > 0:
-            score += min(25, years_exp * 2.5)  # 2.5 points per year, max 25
-            details["experience"] = f"{years_exp} years"
-        else:
-            details["experience"] = "N/A"
-        
-        # Education (15 points)
-        if candidate.get("education_level"):
-            score += 15
-            details["education"] = candidate.get("education_level")
-        else:
-            details["education"] = "N/A"
-        
-        # Certifications (10 points)
-        certs_count = len(candidate.get("certifications", []))
-        if certs_count > 0:
-            score += min(10, certs_count * 2)  # 2 points per cert, max 10
-            details["certifications"] = f"{certs_count} certs"
-        else:
-            details["certifications"] = "0 certs"
-        
-        display_name = name if is_valid_name else candidate.get("filename", "Unknown")
-        ranked_candidates.append({
-            "Candidate": display_name,
-            "Fit Score": round(score, 1),
-            "Max Score": 100,
-            "Experience": details["experience"],
-            "Education": details["education"],
-            "Skills": details["skills"],
-            "Certs": details["certifications"],
-            "Contact": f"{details['email']} {details['phone']}"
-        })
-    
-    if ranked_candidates:
-        ranked_df = pd.DataFrame(ranked_candidates)
-        ranked_df = ranked_df.sort_values("Fit Score", ascending=False)
-        
-        col1, col2 = st.columns([2, 1])
-        
-        with col1:
-            fig = px.bar(
-                ranked_df,
-                x="Candidate",
-                y="Fit Score",
-                title="Candidate Fit Score Ranking (0-100)",
-                labels={"Candidate": "Candidate Name", "Fit Score": "Fit Score"},
-                color="Fit Score",
-                color_continuous_scale=["#ff4444", "#ffaa00", "#88ff00", "#00ff00"],
-                text="Fit Score"
-            )
-            fig.update_traces(textposition='outside')
-            fig.update_layout(
-                height=500,
-                xaxis_tickangle=-45,
-                yaxis_range=[0, 100],
-                showlegend=False,
-                autosize=True
-            )
-            st.plotly_chart(fig, width='stretch', config={'displayModeBar': True, 'responsive': True})
+        with col1:
+            st.plotly_chart(figures["ranking"], width='stretch', config={'displayModeBar': True, 'responsive': True})
         
         with col2:
             st.markdown("#### 🏆 Top Candidates")
-            for rank, (idx, row) in enumerate(ranked_df.head(10).iterrows(), 1):
-                st.markdown(f"""
-                **#{rank} {row['Candidate']}**
-                - Score: **{row['Fit Score']}/100**
-                - Exp: {row['Experience']}
-                - Edu: {row['Education']}
-                """)
+            # ranked_df is already sorted by score; read the top rows column-wise
+            top = ranked_df.head(10)
+            st.markdown("\n\n".join(
+                f"**#{rank} {name}**\n- Score: **{score:.1f}/100**\n- Exp: {experience}\n- Edu: {education}"
+                for rank, (name, score, experience, education) in enumerate(zip(
+                    top["Candidate"].to_numpy(), top["Fit Score"].to_numpy(),
+                    top["Experience"].to_numpy(), top["Education"].to_numpy()
+                ), 1)
+            ))
             
             st.divider()
-            avg_score = ranked_df["Fit Score"].mean()
-            st.metric("Average Fit Score", f"{avg_score:.1f}/100")
-            
-            top_25_pct = len(ranked_df[ranked_df["Fit Score"] >= 75])
-            st.metric("High Fit (75+)", f"{top_25_pct}/{total_count}")
+            st.metric("Average Fit Score", f"{stats['avg_fit_score']:.1f}/100")
+            st.metric("High Fit (75+)", f"{stats['high_fit_count']}/{total_count}")
         
         # Detailed ranking table
         st.markdown("#### 📋 Detailed Ranking Table")
         st.dataframe(
-            ranked_df[["Candidate", "Fit Score", "Experience", "Education", "Skills", "Certs", "Contact"]],
+            stats["ranking_table"],
             width='stretch',
             hide_index=True,
+            column_config={"Fit Score": st.column_config.NumberColumn(format="%.1f")},
             height=400
         )
     
     st.divider()
     
     # Location Distribution (if available)
-    locations = [c.get("location", "") for c in st.session_state.metadata_list if c.get("location")]
-    if locations:
+    if "locations" in figures:
         st.markdown("### 📍 Location Distribution")
-        location_counts = {}
-        for loc in locations:
-            location_counts[loc] = location_counts.get(loc, 0) + 1
-        
-        top_locations = sorted(location_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        loc_df = pd.DataFrame(top_locations, columns=["Location", "Count"])
-        
-        fig = px.bar(
-            loc_df,
-            x="Location",
-            y="Count",
-            title="Top Candidate Locations",
-            labels={"Count": "Number of Candidates", "Location": "City, State"},
-            color="Count",
-            color_continuous_scale="Purples"
-        )
-        fig.update_layout(height=400, xaxis_tickangle=-45, showlegend=False, autosize=True)
-        st.plotly_chart(fig, width='stretch', config={'displayModeBar': True, 'responsive': True})
+        st.plotly_chart(figures["locations"], width='stretch', config={'displayModeBar': True, 'responsive': True})
     
     st.divider()
     
     # Candidate Details Table
     st.markdown("### 👥 Candidate Details")
     
-    # Patterns that indicate invalid names
-    invalid_name_patterns = [
-        r'CERTIFICATE', r'RESUME', r'CV', r'CURRICULUM', r'VITAE',
-        r'APPLICATION', r'PAGE \d+', r'^\d+$',
-    ]
-    
-    candidates_table_data = []
-    for candidate in st.session_state.metadata_list:
-        name = candidate.get("name", "").strip()
-        is_valid_name = False
-        if name:
-            name_upper = name.upper()
-            is_valid_name = not any(re.search(pattern, name_upper) for pattern in invalid_name_patterns)
-            if len(name.split()) < 1 or len(name) < 3:
-                is_valid_name = False
-        
-        display_name = name if is_valid_name else candidate.get("filename", "Unknown")
-        
-        candidates_table_data.append({
-            "Name": display_name,
-            "Email": candidate.get("email", "N/A"),
-            "Phone": candidate.get("phone", "N/A"),
-            "Experience": f"{candidate.get('years_experience', 0)} yrs" if candidate.get('years_experience', 0) > 0 else "N/A",
-            "Education": candidate.get("education_level", "N/A"),
-            "Job Title": ", ".join(candidate.get("job_titles", [])[:2]) if candidate.get("job_titles") else "N/A",
-            "Company": ", ".join(candidate.get("companies", [])[:2]) if candidate.get("companies") else "N/A",
-            "Location": candidate.get("location", "N/A"),
-            "Skills Count": len(candidate.get("skills", [])),
-            "Skills": ", ".join(candidate.get("skills", [])[:5]) + ("..." if len(candidate.get("skills", [])) > 5 else ""),
-            "Certifications": ", ".join(candidate.get("certifications", [])) if candidate.get("certifications") else "N/A",
-            "Filename": candidate.get("filename", "N/A")
-        })
-    
-    candidates_df = pd.DataFrame(candidates_table_data)
     st.dataframe(
-        candidates_df,
+        stats["candidates_table"],
         width='stretch',
         hide_index=True,
         height=400
@@ -1191,8 +1897,7 @@ def show_analytics():
     # Responsive columns: 3 on desktop, 1 on mobile
     col1, col2, col3 = st.columns(3)
     
-    # Calculate summary stats
-    valid_names_count = sum(1 for c in candidates_table_data if c["Name"] != "Unknown" and c["Name"] != c["Filename"])
+    valid_names_count = stats["valid_names_count"]
     
     with col1:
         st.markdown("""
@@ -1232,14 +1937,288 @@ def show_analytics():
         ))
 
 
+@_fragment
+def candidate_browser():
+    """
+    Sidebar filters, candidate list and export. Runs as a fragment, so typing a filter
+    or paging the list reruns only this section rather than the chat and analytics.
+    """
+    # Advanced Filters Section
+    st.markdown("### 🔍 Advanced Filters")
+    
+    with st.expander("🎯 Filter Options", expanded=False):
+        name_filter = st.text_input(
+            "👤 Filter by Name",
+            value="",
+            placeholder="Enter candidate name...",
+            help="Search candidates by name"
+        )
+        
+        skill_filter = st.text_input(
+            "🛠️ Filter by Skill",
+            value="",
+            placeholder="e.g., Python, React, AWS...",
+            help="Search candidates by skill"
+        )
+        
+        # Experience filter
+        exp_filter = st.selectbox(
+            "📊 Experience Level",
+            ["All", "Entry (0-2 yrs)", "Mid (3-5 yrs)", "Senior (6-10 yrs)", "Expert (10+ yrs)"],
+            help="Filter by years of experience"
+        )
+        
+        # Education filter
+        edu_filter = st.selectbox(
+            "🎓 Education Level",
+            ["All", "PhD", "Master's", "Bachelor's", "Associate's", "Diploma"],
+            help="Filter by education level"
+        )
+        
+        use_ranking = st.checkbox(
+            "⭐ Rank by Relevance",
+            value=False,
+            help="Sort results by relevance score"
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🔎 Apply Filters", use_container_width=True):
+                exp_ranges = {
+                    "Entry (0-2 yrs)": (0, 2),
+                    "Mid (3-5 yrs)": (3, 5),
+                    "Senior (6-10 yrs)": (6, 10),
+                    "Expert (10+ yrs)": (11, 100)
+                }
+                filtered = filter_candidates(
+                    name_filter,
+                    skill_filter,
+                    experience_range=exp_ranges.get(exp_filter),
+                    education="" if edu_filter == "All" else edu_filter
+                )
+                
+                # Apply ranking if enabled
+                if use_ranking and filtered:
+                    query_text = f"{name_filter} {skill_filter}".strip()
+                    if query_text:
+                        ranked_results = rank_candidates(filtered, query_text)
+                        st.session_state.filtered_candidates = [candidate for candidate, score in ranked_results]
+                        st.success(f"✅ Found and ranked {len(st.session_state.filtered_candidates)} candidate(s)")
+                    else:
+                        st.session_state.filtered_candidates = filtered
+                else:
+                    st.session_state.filtered_candidates = filtered
+                    st.success(f"✅ Found {len(filtered)} candidate(s)")
+                st.session_state.candidate_list_limit = CANDIDATE_LIST_INITIAL
+        
+        with col2:
+            if st.button("🔄 Clear Filters", use_container_width=True):
+                st.session_state.filtered_candidates = []
+                st.session_state.candidate_list_limit = CANDIDATE_LIST_INITIAL
+                rerun_fragment()
+    
+    st.divider()
+    
+    # Candidates List Section
+    st.markdown("### 👥 Candidates")
+    
+    candidates_to_show = st.session_state.get("filtered_candidates", st.session_state.metadata_list)
+    
+    if candidates_to_show:
+        st.caption(f"Showing {len(candidates_to_show)} candidate(s)")
+        
+        # One markdown element per page of cards instead of an expander, columns and
+        # several markdown elements per candidate; offscreen cards skip rendering
+        # via content-visibility in the stylesheet
+        limit = st.session_state.candidate_list_limit
+        for start in range(0, min(limit, len(candidates_to_show)), CANDIDATE_LIST_STEP):
+            page = candidates_to_show[start:min(start + CANDIDATE_LIST_STEP, limit)]
+            st.markdown("".join(build_candidate_card_html(candidate) for candidate in page), unsafe_allow_html=True)
+        
+        if len(candidates_to_show) > limit:
+            st.caption(f"💡 Showing first {limit} of {len(candidates_to_show)} candidates. Use filters to narrow down.")
+            if st.button("⬇️ Show more", use_container_width=True):
+                st.session_state.candidate_list_limit = limit + CANDIDATE_LIST_STEP
+                rerun_fragment()
+    else:
+        st.info("📭 No candidates loaded.\n\nUpload resumes to get started!")
+    
+    st.divider()
+    
+    # Export Section
+    st.markdown("### 📥 Export Data")
+    
+    candidates_to_export = st.session_state.get("filtered_candidates", st.session_state.metadata_list)
+    
+    if candidates_to_export:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Built in memory only when the download is clicked, without rerunning the app;
+            # nothing is written to the server's working directory
+            export_snapshot = list(candidates_to_export)
+            try:
+                st.download_button(
+                    label="📊 Export CSV",
+                    data=lambda: candidates_to_csv_bytes(export_snapshot),
+                    file_name="candidates_export.csv",
+                    mime="text/csv",
+                    on_click="ignore",
+                    width='stretch'
+                )
+            except (TypeError, StreamlitAPIException):
+                # Streamlit without deferred downloads: build the file behind a button
+                if st.button("📊 Export CSV", use_container_width=True):
+                    try:
+                        st.download_button(
+                            label="⬇️ Download",
+                            data=candidates_to_csv_bytes(candidates_to_export),
+                            file_name="candidates_export.csv",
+                            mime="text/csv"
+                        )
+                        st.success(f"✅ Exported {len(candidates_to_export)} candidates")
+                    except Exception as e:
+                        st.error(f"❌ Error: {e}")
+        
+        with col2:
+            st.caption(f"📦 {len(candidates_to_export)} candidates ready")
+    else:
+        st.info("📭 No data to export")
+    
+    st.divider()
+
+
+@_fragment
+def chat_panel():
+    """
+    Chat history and input. Runs as a fragment, so asking a question or opening a
+    sources expander reruns only the chat rather than the sidebar and analytics.
+    """
+    # Enhanced Chat Header
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.markdown("### 💬 Chat with Resumes")
+        st.caption("Ask questions about the uploaded resumes and get AI-powered answers")
+    with col2:
+        if st.button("🗑️ Clear Chat", use_container_width=True, help="Clear all chat history"):
+            st.session_state.chat_history = new_chat_history()
+            rerun_fragment()
+    
+    st.divider()
+    
+    # Chat Container with better styling
+    chat_container = st.container()
+    
+    with chat_container:
+        # Display chat history with enhanced UI
+        if st.session_state.chat_history:
+            for idx, message in enumerate(st.session_state.chat_history):
+                with st.chat_message(message.role):
+                    # Enhanced message display
+                    st.markdown(message.content)
+                    
+                    # Show source documents in a better format
+                    if message.sources:
+                        label = f"📎 View Sources ({len(message.sources)} documents)"
+                        try:
+                            # Track the expander so sources are only looked up while it is open
+                            sources_expander = st.expander(label, expanded=False,
+                                                           key=f"sources_{message.msg_id}", on_change="rerun")
+                        except TypeError:
+                            # Streamlit releases without expander state tracking render the body every run
+                            sources_expander = st.expander(label, expanded=False)
+                        with sources_expander:
+                            # open is None when expander state isn't tracked; only skip when known to be closed
+                            if getattr(sources_expander, "open", None) is not False:
+                                # Built on first open, then replayed from the message
+                                render_sources_blocks(history_sources_blocks(message))
+        else:
+            # Welcome message when no chat history
+            st.info("""
+            👋 **Welcome to Resume RAG Chatbot!**
+            
+            **Try asking:**
+            - "Who has experience with Python?"
+            - "Show me candidates with AWS certification"
+            - "Find developers with 5+ years of experience"
+            - "What skills do the candidates have?"
+            
+            Type your question in the chat input below to get started!
+            """)
+    
+    # Enhanced Chat Input
+    st.divider()
+    query = st.chat_input(
+        "💬 Ask a question about the resumes... (e.g., 'Who has Python experience?')",
+        key="chat_input"
+    )
+
+    if query:
+        # The previous question gives a follow-up its context during retrieval
+        previous_query = next((m.content for m in reversed(st.session_state.chat_history) if m.role == "user"), None)
+        
+        # Add user message to chat
+        st.session_state.chat_history.append(ChatMsg(role="user", content=query, sources=[], sources_by_candidate={},
+                                                     sources_rendered=None, msg_id=uuid.uuid4().hex))
+        with st.chat_message("user"):
+            st.markdown(query)
+        
+        # Get response with enhanced UI
+        with st.chat_message("assistant"):
+            with st.spinner("🔍 Searching resumes..."):
+                # Retrieve relevant documents (increased k for better diversity)
+                source_docs = query_vector_store(query, k=RETRIEVAL_K, previous_query=previous_query)
+            
+            # Group by candidate once; the fallback answer and chat history reuse it
+            sources_by_candidate = group_sources_by_candidate(source_docs)
+            
+            answer_streamed = False
+            if llm and source_docs:
+                # Use LLM with RAG, rendering tokens as they arrive
+                try:
+                    answer = st.write_stream(stream_response_with_rag(query, llm, source_docs))
+                    answer_streamed = True
+                except Exception as e:
+                    st.error(f"❌ Error: {e}")
+                    logger.error(f"RAG generation error: {e}")
+                    # Fallback to basic retrieval - show all candidates
+                    answer = format_retrieval_answer(sources_by_candidate)
+            elif source_docs:
+                # Basic retrieval without LLM - show all candidates
+                answer = format_retrieval_answer(sources_by_candidate)
+            else:
+                answer = "❌ No relevant information found in the resumes. Try rephrasing your question."
+            
+            # Display answer with better formatting (streamed answers are already on screen)
+            if not answer_streamed:
+                st.markdown(answer)
+            
+            # Show source documents in enhanced format
+            if source_docs:
+                with st.expander(f"📎 Source Documents ({len(source_docs)} found)", expanded=False):
+                    render_sources_blocks(sources_blocks(sources_by_candidate))
+            
+            # Add assistant response to chat history
+            st.session_state.chat_history.append(ChatMsg(
+                role="assistant",
+                content=answer,
+                sources=source_refs(source_docs),
+                sources_by_candidate={
+                    name: source_refs(docs) for name, docs in sources_by_candidate.items()
+                },
+                sources_rendered=None,
+                msg_id=uuid.uuid4().hex
+            ))
+
+
 # Main UI
 st.title("📄 Resume RAG Chatbot")
 st.markdown("Upload multiple resume PDFs and query them conversationally!")
 
 # Security Warning (for production)
-enable_persistence = os.getenv("ENABLE_PERSISTENCE", "false").lower() == "true"
+enable_persistence = ENABLE_PERSISTENCE
 
-if os.getenv("SHOW_SECURITY_WARNING", "true").lower() == "true":
+if SHOW_SECURITY_WARNING:
     with st.expander("⚠️ Security & Privacy Notice", expanded=False):
         if enable_persistence:
             st.warning("""
@@ -1271,554 +2250,10 @@ if os.getenv("SHOW_SECURITY_WARNING", "true").lower() == "true":
             **Note**: To enable persistent storage (saves data across sessions), set `ENABLE_PERSISTENCE=true` in environment variables.
             """)
 
-# Add custom CSS for mobile responsiveness and better UI styling
-st.markdown("""
-<style>
-    /* Mobile responsiveness - Enhanced */
-    @media screen and (max-width: 768px) {
-        /* Main container */
-        .main .block-container {
-            padding-left: 0.5rem !important;
-            padding-right: 0.5rem !important;
-            max-width: 100% !important;
-        }
-        
-        /* Sidebar on mobile - override desktop width, but respect collapsed state */
-        [data-testid="stSidebar"][aria-expanded="true"] {
-            min-width: 100% !important;
-            max-width: 100% !important;
-            width: 100% !important;
-        }
-        
-        /* Collapsed sidebar on mobile - hide completely */
-        [data-testid="stSidebar"][aria-expanded="false"] {
-            width: 0 !important;
-            min-width: 0 !important;
-            max-width: 0 !important;
-        }
-        
-        /* Sidebar content on mobile */
-        [data-testid="stSidebar"][aria-expanded="true"] > div:first-child {
-            padding: 0.75rem !important;
-        }
-        
-        /* Headers - smaller on mobile */
-        h1 {
-            font-size: 1.5rem !important;
-        }
-        h2 {
-            font-size: 1.3rem !important;
-        }
-        h3 {
-            font-size: 1.1rem !important;
-        }
-        h4 {
-            font-size: 1rem !important;
-        }
-        
-        /* Chat messages mobile */
-        [data-testid="stChatMessage"] {
-            padding: 0.5rem !important;
-            font-size: 0.9rem !important;
-        }
-        
-        /* Analytics charts mobile - full width */
-        .js-plotly-plot {
-            width: 100% !important;
-            max-width: 100% !important;
-            height: auto !important;
-            min-height: 300px !important;
-        }
-        
-        /* Plotly container */
-        .plotly {
-            width: 100% !important;
-            max-width: 100% !important;
-        }
-        
-        /* Tabs mobile */
-        [data-baseweb="tab-list"] {
-            flex-wrap: wrap;
-            gap: 0.25rem !important;
-        }
-        
-        [data-baseweb="tab"] {
-            padding: 0.5rem 0.75rem !important;
-            font-size: 0.85rem !important;
-            min-width: auto !important;
-        }
-        
-        /* Metrics mobile - smaller */
-        [data-testid="stMetricValue"] {
-            font-size: 1.2rem !important;
-        }
-        
-        [data-testid="stMetricLabel"] {
-            font-size: 0.75rem !important;
-        }
-        
-        /* Columns - stack on mobile */
-        [data-testid="column"] {
-            width: 100% !important;
-            margin-bottom: 1rem !important;
-            padding-left: 0 !important;
-            padding-right: 0 !important;
-        }
-        
-        /* Dataframes - scrollable */
-        [data-testid="stDataFrame"] {
-            font-size: 0.75rem !important;
-            overflow-x: auto !important;
-            display: block !important;
-        }
-        
-        /* Tables - horizontal scroll */
-        table {
-            display: block !important;
-            overflow-x: auto !important;
-            white-space: nowrap !important;
-            width: 100% !important;
-            font-size: 0.75rem !important;
-        }
-        
-        /* Buttons - full width on mobile */
-        button {
-            width: 100% !important;
-            margin: 0.25rem 0 !important;
-        }
-        
-        /* Markdown text - smaller */
-        p, li, span {
-            font-size: 0.9rem !important;
-        }
-        
-        /* Expanders - smaller padding */
-        [data-testid="stExpander"] {
-            margin: 0.5rem 0 !important;
-        }
-        
-        [data-testid="stExpander"] summary {
-            font-size: 0.9rem !important;
-            padding: 0.5rem !important;
-        }
-        
-        /* Dividers - thinner */
-        hr {
-            margin: 0.75rem 0 !important;
-        }
-        
-        /* Info boxes - smaller padding */
-        .stAlert, .stInfo, .stSuccess, .stWarning, .stError {
-            padding: 0.75rem !important;
-            font-size: 0.85rem !important;
-        }
-        
-        /* Metrics container */
-        [data-testid="stMetricContainer"] {
-            padding: 0.5rem !important;
-            margin: 0.25rem 0 !important;
-        }
-    }
-    
-    /* Tablet responsiveness */
-    @media screen and (min-width: 769px) and (max-width: 1024px) {
-        .main .block-container {
-            padding-left: 1rem !important;
-            padding-right: 1rem !important;
-        }
-        
-        [data-testid="column"] {
-            padding: 0.5rem !important;
-        }
-        
-        .js-plotly-plot {
-            width: 100% !important;
-            max-width: 100% !important;
-        }
-    }
-    
-    /* Sidebar toggle button - ensure visibility */
-    button[kind="header"] {
-        background: transparent !important;
-        color: #ffffff !important;
-    }
-    
-    /* Sidebar toggle button hover */
-    button[kind="header"]:hover {
-        background: rgba(255, 255, 255, 0.1) !important;
-    }
-    
-    /* Sidebar styling - Dark theme to match main content */
-    [data-testid="stSidebar"] {
-        background: #262730 !important;
-        color: #fafafa !important;
-        transition: all 0.3s ease !important;
-    }
-    
-    /* When sidebar is expanded, ensure full width */
-    [data-testid="stSidebar"][aria-expanded="true"] {
-        min-width: 21rem !important;
-        width: 21rem !important;
-        max-width: 21rem !important;
-    }
-    
-    /* Hide collapsed sidebar completely - cleaner UI */
-    [data-testid="stSidebar"][aria-expanded="false"] {
-        width: 0 !important;
-        min-width: 0 !important;
-        max-width: 0 !important;
-        overflow: hidden !important;
-        padding: 0 !important;
-        margin: 0 !important;
-        border: none !important;
-    }
-    
-    /* Hide sidebar content when collapsed */
-    [data-testid="stSidebar"][aria-expanded="false"] > * {
-        display: none !important;
-        visibility: hidden !important;
-        opacity: 0 !important;
-    }
-    
-    /* Ensure sidebar content is properly sized when expanded */
-    [data-testid="stSidebar"][aria-expanded="true"] > div:first-child {
-        width: 100% !important;
-        max-width: 100% !important;
-        display: block !important;
-        visibility: visible !important;
-        opacity: 1 !important;
-    }
-    
-    /* Sidebar content area */
-    [data-testid="stSidebar"] > div:first-child {
-        background: #262730 !important;
-        width: 100% !important;
-        max-width: 100% !important;
-        padding: 1rem !important;
-    }
-    
-    /* Sidebar scrollable content */
-    [data-testid="stSidebar"] [data-testid="stVerticalBlock"] {
-        width: 100% !important;
-    }
-    
-    /* Sidebar text visibility - light text on dark background */
-    [data-testid="stSidebar"] * {
-        color: #fafafa !important;
-    }
-    
-    /* Override Streamlit's default sidebar background */
-    [data-testid="stSidebar"] .css-1d391kg {
-        background: #262730 !important;
-    }
-    
-    /* Sidebar scrollbar - dark theme */
-    [data-testid="stSidebar"]::-webkit-scrollbar {
-        width: 8px;
-    }
-    
-    [data-testid="stSidebar"]::-webkit-scrollbar-track {
-        background: #1e1e24;
-    }
-    
-    [data-testid="stSidebar"]::-webkit-scrollbar-thumb {
-        background: #4a4a5a;
-        border-radius: 4px;
-    }
-    
-    [data-testid="stSidebar"]::-webkit-scrollbar-thumb:hover {
-        background: #5a5a6a;
-    }
-    
-    /* Sidebar headers - light color */
-    [data-testid="stSidebar"] h1,
-    [data-testid="stSidebar"] h2,
-    [data-testid="stSidebar"] h3,
-    [data-testid="stSidebar"] h4 {
-        color: #4fc3f7 !important;
-        font-weight: 600 !important;
-    }
-    
-    /* Sidebar markdown text - light color */
-    [data-testid="stSidebar"] p,
-    [data-testid="stSidebar"] span,
-    [data-testid="stSidebar"] div {
-        color: #fafafa !important;
-    }
-    
-    /* Sidebar input fields - dark theme */
-    [data-testid="stSidebar"] input,
-    [data-testid="stSidebar"] textarea,
-    [data-testid="stSidebar"] select {
-        background: #1e1e24 !important;
-        color: #fafafa !important;
-        border: 1px solid #4a4a5a !important;
-    }
-    
-    /* Sidebar input focus - light blue accent */
-    [data-testid="stSidebar"] input:focus,
-    [data-testid="stSidebar"] textarea:focus,
-    [data-testid="stSidebar"] select:focus {
-        border: 2px solid #4fc3f7 !important;
-        box-shadow: 0 0 0 0.2rem rgba(79, 195, 247, 0.25) !important;
-        background: #2a2a35 !important;
-    }
-    
-    /* Sidebar input placeholders */
-    [data-testid="stSidebar"] input::placeholder,
-    [data-testid="stSidebar"] textarea::placeholder {
-        color: #9e9e9e !important;
-    }
-    
-    /* Sidebar buttons */
-    [data-testid="stSidebar"] button {
-        color: #ffffff !important;
-    }
-    
-    /* Sidebar button hover states */
-    [data-testid="stSidebar"] button:hover {
-        opacity: 0.9;
-    }
-    
-    /* Sidebar info boxes - dark theme */
-    [data-testid="stSidebar"] .stAlert {
-        background: #1e1e24 !important;
-        border: 1px solid #4a4a5a !important;
-        color: #fafafa !important;
-    }
-    
-    /* Sidebar success messages - dark theme */
-    [data-testid="stSidebar"] .stSuccess {
-        background: #1e4620 !important;
-        color: #81c784 !important;
-        border: 1px solid #4caf50 !important;
-    }
-    
-    /* Sidebar info messages - dark theme */
-    [data-testid="stSidebar"] .stInfo {
-        background: #0d3a5f !important;
-        color: #64b5f6 !important;
-        border: 1px solid #2196f3 !important;
-    }
-    
-    /* Sidebar warning messages - dark theme */
-    [data-testid="stSidebar"] .stWarning {
-        background: #5d4037 !important;
-        color: #ffb74d !important;
-        border: 1px solid #ff9800 !important;
-    }
-    
-    /* Sidebar error messages - dark theme */
-    [data-testid="stSidebar"] .stError {
-        background: #5f2120 !important;
-        color: #e57373 !important;
-        border: 1px solid #f44336 !important;
-    }
-    
-    /* Sidebar metrics - light text */
-    [data-testid="stSidebar"] [data-testid="stMetricLabel"],
-    [data-testid="stSidebar"] [data-testid="stMetricValue"] {
-        color: #fafafa !important;
-        font-weight: 500 !important;
-    }
-    
-    /* Sidebar captions - lighter gray */
-    [data-testid="stSidebar"] .stCaption {
-        color: #b0b0b0 !important;
-    }
-    
-    /* Sidebar expanders - dark theme */
-    [data-testid="stSidebar"] [data-testid="stExpander"] {
-        background: #1e1e24 !important;
-        border: 1px solid #4a4a5a !important;
-        border-radius: 0.5rem !important;
-    }
-    
-    /* Sidebar expander header */
-    [data-testid="stSidebar"] [data-testid="stExpander"] summary {
-        background: #1e1e24 !important;
-        color: #fafafa !important;
-    }
-    
-    /* Sidebar expander content */
-    [data-testid="stSidebar"] [data-testid="stExpander"] div {
-        background: #1e1e24 !important;
-        color: #fafafa !important;
-    }
-    
-    /* Sidebar dividers - lighter for visibility */
-    [data-testid="stSidebar"] hr {
-        border-color: #4a4a5a !important;
-        border-width: 1px !important;
-    }
-    
-    /* Sidebar section backgrounds */
-    [data-testid="stSidebar"] .element-container {
-        background: transparent !important;
-    }
-    
-    /* Sidebar file uploader - dark theme */
-    [data-testid="stSidebar"] [data-testid="stFileUploader"] {
-        background: #1e1e24 !important;
-        border: 1px solid #4a4a5a !important;
-        border-radius: 0.5rem !important;
-        padding: 0.5rem !important;
-    }
-    
-    /* Sidebar checkboxes and radio buttons */
-    [data-testid="stSidebar"] input[type="checkbox"],
-    [data-testid="stSidebar"] input[type="radio"] {
-        accent-color: #4fc3f7 !important;
-    }
-    
-    /* Sidebar labels */
-    [data-testid="stSidebar"] label {
-        color: #fafafa !important;
-    }
-    
-    /* Sidebar select dropdowns */
-    [data-testid="stSidebar"] select option {
-        background: #1e1e24 !important;
-        color: #fafafa !important;
-    }
-    
-    /* Sidebar section backgrounds - ensure full width */
-    [data-testid="stSidebar"] .element-container {
-        background: transparent !important;
-        width: 100% !important;
-        max-width: 100% !important;
-        overflow: visible !important;
-    }
-    
-    /* Prevent sidebar content from being cut off */
-    [data-testid="stSidebar"] * {
-        box-sizing: border-box !important;
-    }
-    
-    /* Sidebar file uploader and inputs - ensure full width */
-    [data-testid="stSidebar"] [data-testid="stFileUploader"],
-    [data-testid="stSidebar"] input,
-    [data-testid="stSidebar"] textarea,
-    [data-testid="stSidebar"] select,
-    [data-testid="stSidebar"] button {
-        width: 100% !important;
-        max-width: 100% !important;
-    }
-    
-    /* Better spacing for sidebar sections */
-    .sidebar-section {
-        margin-bottom: 1.5rem;
-    }
-    
-    /* Chat interface styling */
-    [data-testid="stChatMessage"] {
-        padding: 1rem;
-        margin: 0.5rem 0;
-        border-radius: 0.5rem;
-    }
-    
-    /* Chat input styling */
-    [data-testid="stChatInput"] {
-        position: sticky;
-        bottom: 0;
-        background: white;
-        padding: 1rem;
-        border-top: 1px solid #e0e0e0;
-        z-index: 100;
-    }
-    
-    /* Source documents expander */
-    [data-testid="stExpander"] {
-        margin: 0.5rem 0;
-    }
-    
-    /* Analytics charts responsive */
-    .js-plotly-plot {
-        max-width: 100%;
-        height: auto;
-    }
-    
-    /* Metrics cards */
-    [data-testid="stMetricContainer"] {
-        padding: 0.75rem;
-        border-radius: 0.5rem;
-        background: #f8f9fa;
-        margin: 0.5rem 0;
-    }
-    
-    /* Tab styling */
-    [data-baseweb="tab"] {
-        padding: 0.75rem 1.5rem;
-        font-weight: 500;
-    }
-    
-    /* Better button spacing */
-    button[kind="primary"] {
-        margin: 0.5rem 0;
-    }
-    
-    /* Chat message bubbles */
-    .stChatMessage {
-        animation: fadeIn 0.3s ease-in;
-    }
-    
-    @keyframes fadeIn {
-        from {
-            opacity: 0;
-            transform: translateY(10px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    /* Source document cards */
-    .source-doc-card {
-        background: #f8f9fa;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin: 0.5rem 0;
-        border-left: 3px solid #1f77b4;
-    }
-    
-    /* Analytics section spacing */
-    .analytics-section {
-        margin: 1.5rem 0;
-    }
-    
-    /* Additional mobile optimizations for extra small screens */
-    @media screen and (max-width: 480px) {
-        /* Extra small screens */
-        h1 {
-            font-size: 1.3rem !important;
-        }
-        h2 {
-            font-size: 1.1rem !important;
-        }
-        h3 {
-            font-size: 1rem !important;
-        }
-        
-        [data-testid="stMetricValue"] {
-            font-size: 1rem !important;
-        }
-        
-        .js-plotly-plot {
-            min-height: 250px !important;
-        }
-        
-        button {
-            font-size: 0.85rem !important;
-            padding: 0.5rem !important;
-        }
-        
-        [data-testid="stDataFrame"] {
-            font-size: 0.7rem !important;
-        }
-    }
-</style>
-""", unsafe_allow_html=True)
+# Add custom CSS for mobile responsiveness and better UI styling.
+# Streamlit drops elements that a rerun doesn't emit, so the style block is sent on
+# every run; only the file read is cached.
+st.markdown(f"<style>\n{load_app_css()}</style>", unsafe_allow_html=True)
 
 # Check for API keys and display status
 try:
@@ -1829,10 +2264,12 @@ except ImportError:
     llm_provider = os.getenv("LLM_PROVIDER", "openai").lower()
     llm_model = os.getenv("LLM_MODEL", "gpt-4o-mini")
 
-llm = get_llm()
+llm = get_cached_llm(llm_provider, llm_model)
 
-# Load existing store on startup (only if persistence enabled)
-load_existing_store()
+# Load existing store once per session (only if persistence enabled)
+if "_store_loaded" not in st.session_state:
+    load_existing_store()
+    st.session_state._store_loaded = True
 
 # Enhanced Sidebar with perfect UI and mobile responsiveness
 with st.sidebar:
@@ -1872,9 +2309,11 @@ with st.sidebar:
     
     if total_candidates > 0:
         # Additional stats
-        with_emails = sum(1 for c in st.session_state.metadata_list if c.get("email"))
-        with_phones = sum(1 for c in st.session_state.metadata_list if c.get("phone"))
-        total_skills = sum(len(c.get("skills", [])) for c in st.session_state.metadata_list)
+        # Cached per metadata signature instead of re-walking metadata_list
+        quick_stats = _compute_quick_stats(get_metadata_signature(), get_metadata_df())
+        with_emails = quick_stats["with_emails"]
+        with_phones = quick_stats["with_phones"]
+        total_skills = quick_stats["total_skills"]
         avg_skills = total_skills / total_candidates if total_candidates > 0 else 0
         
         st.markdown(f"""
@@ -1903,9 +2342,9 @@ with st.sidebar:
             st.caption(f"... and {len(uploaded_files) - 3} more")
     
     use_ocr = st.checkbox(
-        "🔍 Use OCR (for scanned PDFs)",
+        "🔍 OCR scanned pages",
         value=False,
-        help="Enable OCR for scanned/image-based PDFs. Slower but more accurate for non-text PDFs."
+        help="OCR pages that have no text layer (scanned/image-based). Pages with embedded text are read directly, so digital PDFs are not slowed down."
     )
     
     if st.button("🚀 Process Resumes", type="primary", use_container_width=True):
@@ -1916,170 +2355,9 @@ with st.sidebar:
     
     st.divider()
     
-    # Advanced Filters Section
-    st.markdown("### 🔍 Advanced Filters")
-    
-    with st.expander("🎯 Filter Options", expanded=False):
-        name_filter = st.text_input(
-            "👤 Filter by Name",
-            value="",
-            placeholder="Enter candidate name...",
-            help="Search candidates by name"
-        )
-        
-        skill_filter = st.text_input(
-            "🛠️ Filter by Skill",
-            value="",
-            placeholder="e.g., Python, React, AWS...",
-            help="Search candidates by skill"
-        )
-        
-        # Experience filter
-        exp_filter = st.selectbox(
-            "📊 Experience Level",
-            ["All", "Entry (0-2 yrs)", "Mid (3-5 yrs)", "Senior (6-10 yrs)", "Expert (10+ yrs)"],
-            help="Filter by years of experience"
-        )
-        
-        # Education filter
-        edu_filter = st.selectbox(
-            "🎓 Education Level",
-            ["All", "PhD", "Master's", "Bachelor's", "Associate's", "Diploma"],
-            help="Filter by education level"
-        )
-        
-        use_ranking = st.checkbox(
-            "⭐ Rank by Relevance",
-            value=False,
-            help="Sort results by relevance score"
-        )
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("🔎 Apply Filters", use_container_width=True):
-                filtered = filter_candidates(name_filter, skill_filter)
-                
-                # Apply experience filter
-                if exp_filter != "All":
-                    exp_ranges = {
-                        "Entry (0-2 yrs)": (0, 2),
-                        "Mid (3-5 yrs)": (3, 5),
-                        "Senior (6-10 yrs)": (6, 10),
-                        "Expert (10+ yrs)": (11, 100)
-                    }
-                    min_exp, max_exp = exp_ranges[exp_filter]
-                    filtered = [c for c in filtered if min_exp <= c.get("years_experience", 0) <= max_exp]
-                
-                # Apply education filter
-                if edu_filter != "All":
-                    filtered = [c for c in filtered if c.get("education_level", "") == edu_filter]
-                
-                # Apply ranking if enabled
-                if use_ranking and filtered:
-                    query_text = f"{name_filter} {skill_filter}".strip()
-                    if query_text:
-                        ranked_results = rank_candidates(filtered, query_text)
-                        st.session_state.filtered_candidates = [candidate for candidate, score in ranked_results]
-                        st.success(f"✅ Found and ranked {len(st.session_state.filtered_candidates)} candidate(s)")
-                    else:
-                        st.session_state.filtered_candidates = filtered
-                else:
-                    st.session_state.filtered_candidates = filtered
-                    st.success(f"✅ Found {len(filtered)} candidate(s)")
-        
-        with col2:
-            if st.button("🔄 Clear Filters", use_container_width=True):
-                st.session_state.filtered_candidates = []
-                st.rerun()
-    
-    st.divider()
-    
-    # Candidates List Section
-    st.markdown("### 👥 Candidates")
-    
-    candidates_to_show = st.session_state.get("filtered_candidates", st.session_state.metadata_list)
-    
-    if candidates_to_show:
-        st.caption(f"Showing {len(candidates_to_show)} candidate(s)")
-        
-        # Scrollable container for candidates
-        for idx, candidate in enumerate(candidates_to_show[:10]):  # Limit to 10 for performance
-            name = candidate.get('name', candidate.get('filename', 'Unknown'))
-            is_valid_name = name and name != candidate.get('filename', '')
-            
-            with st.expander(f"📄 {name[:30]}{'...' if len(name) > 30 else ''}", expanded=False):
-                # Candidate details
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown(f"**📧 Email:**\n{candidate.get('email', 'N/A')}")
-                    st.markdown(f"**📞 Phone:**\n{candidate.get('phone', 'N/A')}")
-                
-                with col2:
-                    exp_years = candidate.get('years_experience', 0)
-                    st.markdown(f"**📊 Experience:**\n{exp_years} yrs" if exp_years > 0 else "**📊 Experience:**\nN/A")
-                    st.markdown(f"**🎓 Education:**\n{candidate.get('education_level', 'N/A')}")
-                
-                # Skills
-                skills = candidate.get('skills', [])
-                if skills:
-                    st.markdown(f"**🛠️ Skills:** {len(skills)}")
-                    skill_tags = ", ".join(skills[:5])
-                    st.caption(skill_tags + ("..." if len(skills) > 5 else ""))
-                
-                # Additional info
-                if candidate.get('job_titles'):
-                    st.markdown(f"**💼 Title:** {', '.join(candidate.get('job_titles', [])[:2])}")
-                if candidate.get('companies'):
-                    st.markdown(f"**🏢 Company:** {', '.join(candidate.get('companies', [])[:2])}")
-                if candidate.get('location'):
-                    st.markdown(f"**📍 Location:** {candidate.get('location')}")
-                if candidate.get('certifications'):
-                    st.markdown(f"**🏆 Certifications:** {', '.join(candidate.get('certifications', [])[:3])}")
-                
-                st.caption(f"📁 File: {candidate.get('filename', 'N/A')}")
-        
-        if len(candidates_to_show) > 10:
-            st.info(f"💡 Showing first 10 of {len(candidates_to_show)} candidates. Use filters to narrow down.")
-    else:
-        st.info("📭 No candidates loaded.\n\nUpload resumes to get started!")
-    
-    st.divider()
-    
-    # Export Section
-    st.markdown("### 📥 Export Data")
-    
-    candidates_to_export = st.session_state.get("filtered_candidates", st.session_state.metadata_list)
-    
-    if candidates_to_export:
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if st.button("📊 Export CSV", use_container_width=True):
-                try:
-                    export_path = "candidates_export.csv"
-                    if export_candidates_to_csv(candidates_to_export, export_path):
-                        with open(export_path, 'rb') as f:
-                            st.download_button(
-                                label="⬇️ Download",
-                                data=f,
-                                file_name="candidates_export.csv",
-                                mime="text/csv",
-                                width='stretch'
-                            )
-                        st.success(f"✅ Exported {len(candidates_to_export)} candidates")
-                    else:
-                        st.error("❌ Export failed")
-                except Exception as e:
-                    st.error(f"❌ Error: {e}")
-        
-        with col2:
-            st.caption(f"📦 {len(candidates_to_export)} candidates ready")
-    else:
-        st.info("📭 No data to export")
-    
-    st.divider()
+    candidate_browser()
     
+
     # Data Management Section
     st.markdown("### 🗑️ Data Management")
     
@@ -2096,12 +2374,23 @@ with st.sidebar:
                     os.remove(METADATA_FILE)
                     logger.info("Metadata file deleted")
                 
+                # Drop this session's entries from the process-wide analytics caches
+                if st.session_state.metadata_list:
+                    clear_analytics_cache()
+                
                 # Clear session state
                 st.session_state.vector_store = None
                 st.session_state.metadata_list = []
                 st.session_state.documents_processed = False
-                st.session_state.chat_history = []
+                st.session_state.chat_history = new_chat_history()
                 st.session_state.filtered_candidates = []
+                st.session_state.candidate_blocks = {}
+                st.session_state.query_cache.clear()
+                st.session_state.query_embeddings.clear()
+                # Session-owned analytics figures and metadata frames hold candidate data too
+                for key in ("_analytics_figures", "_metadata_df", "_metadata_df_key",
+                            "_metadata_search_text", "_metadata_sig"):
+                    st.session_state.pop(key, None)
                 st.session_state.confirm_delete = False
                 
                 st.success("✅ All data cleared!")
@@ -2124,199 +2413,21 @@ with st.sidebar:
 # Main chat area
 if st.session_state.documents_processed and st.session_state.vector_store:
     # Add tabs for Chat and Analytics with better styling
-    tab1, tab2 = st.tabs(["💬 Chat", "📊 Analytics"])
+    tab_labels = ["💬 Chat", "📊 Analytics"]
+    try:
+        # Track the selected tab so the analytics body only runs while it is open
+        tab1, tab2 = st.tabs(tab_labels, key="main_tabs", on_change="rerun")
+    except TypeError:
+        # Streamlit releases without tab state tracking render every tab body
+        tab1, tab2 = st.tabs(tab_labels)
     
     with tab1:
-        # Enhanced Chat Header
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            st.markdown("### 💬 Chat with Resumes")
-            st.caption("Ask questions about the uploaded resumes and get AI-powered answers")
-        with col2:
-            if st.button("🗑️ Clear Chat", use_container_width=True, help="Clear all chat history"):
-                st.session_state.chat_history = []
-                st.rerun()
-        
-        st.divider()
-        
-        # Chat Container with better styling
-        chat_container = st.container()
-        
-        with chat_container:
-            # Display chat history with enhanced UI
-            if st.session_state.chat_history:
-                for idx, message in enumerate(st.session_state.chat_history):
-                    with st.chat_message(message["role"]):
-                        # Enhanced message display
-                        st.markdown(message["content"])
-                        
-                        # Show source documents in a better format
-                        if "sources" in message and message["sources"]:
-                            with st.expander(f"📎 View Sources ({len(message['sources'])} documents)", expanded=False):
-                                # Group sources by candidate
-                                candidates_sources = {}
-                                for source in message["sources"][:10]:  # Limit to 10
-                                    candidate_name = source.metadata.get('name', source.metadata.get('filename', 'Unknown'))
-                                    if candidate_name not in candidates_sources:
-                                        candidates_sources[candidate_name] = []
-                                    candidates_sources[candidate_name].append(source)
-                                
-                                for candidate_name, sources in candidates_sources.items():
-                                    st.markdown(f"**👤 {candidate_name}**")
-                                    
-                                    # Show candidate metadata
-                                    if sources[0].metadata.get('email'):
-                                        st.caption(f"📧 {sources[0].metadata.get('email')}")
-                                    if sources[0].metadata.get('skills'):
-                                        st.caption(f"🛠️ Skills: {sources[0].metadata.get('skills', 'N/A')[:100]}")
-                                    
-                                    # Show snippets
-                                    for i, source in enumerate(sources[:3], 1):
-                                        st.markdown(f"**Snippet {i}:**")
-                                        st.info(f"{source.page_content[:250]}...")
-                                    
-                                    if len(sources) > 3:
-                                        st.caption(f"... and {len(sources) - 3} more snippets")
-                                    
-                                    st.divider()
-            else:
-                # Welcome message when no chat history
-                st.info("""
-                👋 **Welcome to Resume RAG Chatbot!**
-                
-                **Try asking:**
-                - "Who has experience with Python?"
-                - "Show me candidates with AWS certification"
-                - "Find developers with 5+ years of experience"
-                - "What skills do the candidates have?"
-                
-                Type your question in the chat input below to get started!
-                """)
-        
-        # Enhanced Chat Input
-        st.divider()
-        query = st.chat_input(
-            "💬 Ask a question about the resumes... (e.g., 'Who has Python experience?')",
-            key="chat_input"
-        )
-    
-        if query:
-            # Add user message to chat
-            st.session_state.chat_history.append({"role": "user", "content": query})
-            with st.chat_message("user"):
-                st.markdown(query)
-            
-            # Get response with enhanced UI
-            with st.chat_message("assistant"):
-                with st.spinner("🔍 Searching resumes and generating response..."):
-                    # Retrieve relevant documents (increased k for better diversity)
-                    source_docs = query_vector_store(query, k=10)
-                    
-                    # Get LLM if available (use cached or get new)
-                    if "llm_instance" not in st.session_state or st.session_state.llm_instance is None:
-                        st.session_state.llm_instance = get_llm()
-                    llm = st.session_state.llm_instance
-                    
-                    if llm and source_docs:
-                        # Use LLM with RAG
-                        try:
-                            answer = generate_response_with_rag(query, llm, source_docs)
-                        except Exception as e:
-                            st.error(f"❌ Error: {e}")
-                            logger.error(f"RAG generation error: {e}")
-                            # Fallback to basic retrieval - show all candidates
-                            candidates_found = {}
-                            for doc in source_docs:
-                                candidate_name = doc.metadata.get("name", doc.metadata.get("filename", "Unknown"))
-                                if candidate_name not in candidates_found:
-                                    candidates_found[candidate_name] = []
-                                candidates_found[candidate_name].append(doc)
-                            
-                            answer = f"Found relevant information from {len(candidates_found)} candidate(s):\n\n"
-                            for idx, (candidate_name, docs) in enumerate(candidates_found.items(), 1):
-                                answer += f"**{idx}. {candidate_name}**\n"
-                                if docs[0].metadata.get("email"):
-                                    answer += f"📧 Email: {docs[0].metadata.get('email')}\n"
-                                answer += f"📄 Relevant sections:\n"
-                                for i, doc in enumerate(docs[:3], 1):
-                                    answer += f"  {i}. {doc.page_content[:300]}...\n\n"
-                    elif source_docs:
-                        # Basic retrieval without LLM - show all candidates
-                        candidates_found = {}
-                        for doc in source_docs:
-                            candidate_name = doc.metadata.get("name", doc.metadata.get("filename", "Unknown"))
-                            if candidate_name not in candidates_found:
-                                candidates_found[candidate_name] = []
-                            candidates_found[candidate_name].append(doc)
-                        
-                        answer = f"Found relevant information from {len(candidates_found)} candidate(s):\n\n"
-                        for idx, (candidate_name, docs) in enumerate(candidates_found.items(), 1):
-                            answer += f"**{idx}. {candidate_name}**\n"
-                            if docs[0].metadata.get("email"):
-                                answer += f"📧 Email: {docs[0].metadata.get('email')}\n"
-                            answer += f"📄 Relevant sections:\n"
-                            for i, doc in enumerate(docs[:3], 1):
-                                answer += f"  {i}. {doc.page_content[:300]}...\n\n"
-                    else:
-                        answer = "❌ No relevant information found in the resumes. Try rephrasing your question."
-                    
-                    # Display answer with better formatting
-                    st.markdown(answer)
-                    
-                    # Show source documents in enhanced format
-                    if source_docs:
-                        with st.expander(f"📎 Source Documents ({len(source_docs)} found)", expanded=False):
-                            # Group by candidate
-                            candidates_sources = {}
-                            for doc in source_docs[:10]:  # Limit to 10
-                                candidate_name = doc.metadata.get('name', doc.metadata.get('filename', 'Unknown'))
-                                if candidate_name not in candidates_sources:
-                                    candidates_sources[candidate_name] = []
-                                candidates_sources[candidate_name].append(doc)
-                            
-                            for candidate_name, docs in candidates_sources.items():
-                                # Candidate header
-                                st.markdown(f"**👤 {candidate_name}**")
-                                
-                                # Metadata in columns for mobile responsiveness
-                                col1, col2 = st.columns(2)
-                                with col1:
-                                    if docs[0].metadata.get('email'):
-                                        st.caption(f"📧 {docs[0].metadata.get('email')}")
-                                    if docs[0].metadata.get('phone'):
-                                        st.caption(f"📞 {docs[0].metadata.get('phone')}")
-                                with col2:
-                                    if docs[0].metadata.get('years_experience', 0) > 0:
-                                        st.caption(f"📊 {docs[0].metadata.get('years_experience')} yrs exp")
-                                    if docs[0].metadata.get('education_level'):
-                                        st.caption(f"🎓 {docs[0].metadata.get('education_level')}")
-                                
-                                # Skills
-                                if docs[0].metadata.get('skills'):
-                                    skills_display = docs[0].metadata.get('skills', 'N/A')
-                                    if len(skills_display) > 100:
-                                        skills_display = skills_display[:100] + "..."
-                                    st.caption(f"🛠️ {skills_display}")
-                                
-                                # Show snippets
-                                for i, doc in enumerate(docs[:3], 1):
-                                    st.markdown(f"**📄 Snippet {i}:**")
-                                    st.info(f"{doc.page_content[:300]}...")
-                                
-                                if len(docs) > 3:
-                                    st.caption(f"💡 ... and {len(docs) - 3} more snippets from this candidate")
-                                
-                                st.divider()
-                    
-                    # Add assistant response to chat history
-                    st.session_state.chat_history.append({
-                        "role": "assistant",
-                        "content": answer,
-                        "sources": source_docs
-                    })
+        chat_panel()
     
     with tab2:
-        show_analytics()
+        # open is None when tab state isn't tracked; only skip when known to be hidden
+        if getattr(tab2, "open", None) is not False:
+            show_analytics()
 
 else:
     st.info("👈 Please upload and process resume PDFs in the sidebar to start chatting!")
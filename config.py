@@ -9,12 +9,18 @@ import logging
 # Load environment variables (override to ensure latest values)
 load_dotenv(override=True)
 
+# Snapshot of the environment after .env is applied; settings below are plain dict
+# lookups rather than os.environ accesses (each of which re-encodes the key)
+_ENV = dict(os.environ)
+_env = _ENV.get
+
 # Configure logging
 logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    level=_env("LOG_LEVEL", "INFO").upper(),
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     handlers=[
-        logging.FileHandler("app.log"),
+        # delay: app.log is only opened when the first record is written
+        logging.FileHandler("app.log", delay=True),
         logging.StreamHandler()
     ]
 )
@@ -25,43 +31,70 @@ class Config:
     """Application configuration."""
     
     # API Keys
-    OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
-    ANTHROPIC_API_KEY: Optional[str] = os.getenv("ANTHROPIC_API_KEY")
+    OPENAI_API_KEY: Optional[str] = _env("OPENAI_API_KEY")
+    ANTHROPIC_API_KEY: Optional[str] = _env("ANTHROPIC_API_KEY")
     
     # Azure OpenAI Configuration
-    AZURE_OPENAI_KEY: Optional[str] = os.getenv("AZURE_OPENAI_KEY")
-    AZURE_OPENAI_ENDPOINT: Optional[str] = os.getenv("AZURE_OPENAI_ENDPOINT")
-    AZURE_OPENAI_DEPLOYMENT: Optional[str] = os.getenv("AZURE_OPENAI_DEPLOYMENT")
-    AZURE_OPENAI_EMBEDDING_DEPLOYMENT: Optional[str] = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
-    AZURE_OPENAI_API_VERSION: str = os.getenv("AZURE_OPENAI_API_VERSION", "2025-01-01-preview")
+    AZURE_OPENAI_KEY: Optional[str] = _env("AZURE_OPENAI_KEY")
+    AZURE_OPENAI_ENDPOINT: Optional[str] = _env("AZURE_OPENAI_ENDPOINT")
+    AZURE_OPENAI_DEPLOYMENT: Optional[str] = _env("AZURE_OPENAI_DEPLOYMENT")
+    AZURE_OPENAI_EMBEDDING_DEPLOYMENT: Optional[str] = _env("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+    AZURE_OPENAI_API_VERSION: str = _env("AZURE_OPENAI_API_VERSION", "2025-01-01-preview")
     
     # Model Configuration
-    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "azure_openai" if os.getenv("AZURE_OPENAI_KEY") else "openai").lower()
-    LLM_MODEL: str = os.getenv("LLM_MODEL", os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o-mini"))
-    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "openai").lower()
-    EMBEDDING_MODEL_NAME: str = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+    LLM_PROVIDER: str = _env("LLM_PROVIDER", "azure_openai" if _env("AZURE_OPENAI_KEY") else "openai").lower()
+    LLM_MODEL: str = _env("LLM_MODEL", _env("AZURE_OPENAI_DEPLOYMENT", "gpt-4o-mini"))
+    EMBEDDING_MODEL: str = _env("EMBEDDING_MODEL", "openai").lower()
+    EMBEDDING_MODEL_NAME: str = _env("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+    # Texts per embedding call (0 = provider default: 64 for local models, 512 for OpenAI/Azure)
+    EMBEDDING_BATCH_SIZE: int = int(_env("EMBEDDING_BATCH_SIZE", "0"))
+    # Local model runtime: torch, onnx or openvino, optionally with a specific (e.g. int8-quantized) export
+    EMBEDDING_BACKEND: str = _env("EMBEDDING_BACKEND", "torch").lower()
+    EMBEDDING_MODEL_FILE: str = _env("EMBEDDING_MODEL_FILE", "")
+    # Weight precision for the PyTorch backend: float32, float16 (GPU) or bfloat16 (GPU / recent CPUs)
+    EMBEDDING_DTYPE: str = _env("EMBEDDING_DTYPE", "float32").lower()
+    # SQLite file caching chunk embeddings across restarts (empty = disabled).
+    # It holds vectors derived from resume text, so only enable it where persistence is acceptable.
+    EMBEDDING_CACHE_FILE: str = _env("EMBEDDING_CACHE_FILE", "")
     
     # Ollama Configuration
-    OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-    OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama2")
+    OLLAMA_BASE_URL: str = _env("OLLAMA_BASE_URL", "http://localhost:11434")
+    OLLAMA_MODEL: str = _env("OLLAMA_MODEL", "llama2")
     
     # Application Settings
-    VECTOR_STORE_DIR: str = os.getenv("VECTOR_STORE_DIR", "./faiss_store")
-    METADATA_FILE: str = os.getenv("METADATA_FILE", "./metadata.pkl")
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    VECTOR_STORE_DIR: str = _env("VECTOR_STORE_DIR", "./faiss_store")
+    METADATA_FILE: str = _env("METADATA_FILE", "./metadata.pkl")
+    LOG_LEVEL: str = _env("LOG_LEVEL", "INFO")
+    # Save the vector store and metadata to disk (off by default for multi-user deployments)
+    ENABLE_PERSISTENCE: bool = _env("ENABLE_PERSISTENCE", "false").lower() == "true"
+    SHOW_SECURITY_WARNING: bool = _env("SHOW_SECURITY_WARNING", "true").lower() == "true"
     
     # Text Processing
-    MAX_CHUNK_SIZE: int = int(os.getenv("MAX_CHUNK_SIZE", "1000"))
-    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "200"))
-    MAX_DOCUMENTS: int = int(os.getenv("MAX_DOCUMENTS", "10000"))
+    MAX_CHUNK_SIZE: int = int(_env("MAX_CHUNK_SIZE", "1000"))
+    CHUNK_OVERLAP: int = int(_env("CHUNK_OVERLAP", "200"))
+    MAX_DOCUMENTS: int = int(_env("MAX_DOCUMENTS", "10000"))
     
     # Search Settings
-    DEFAULT_K_RESULTS: int = int(os.getenv("DEFAULT_K_RESULTS", "5"))
-    MAX_K_RESULTS: int = int(os.getenv("MAX_K_RESULTS", "20"))
+    DEFAULT_K_RESULTS: int = int(_env("DEFAULT_K_RESULTS", "5"))
+    MAX_K_RESULTS: int = int(_env("MAX_K_RESULTS", "20"))
+    
+    # Vector Index Settings (flat index is rebuilt as VECTOR_INDEX_TYPE above its threshold)
+    VECTOR_INDEX_TYPE: str = _env("VECTOR_INDEX_TYPE", "hnsw").lower()  # hnsw, ivfpq, sq8, flat
+    HNSW_THRESHOLD: int = int(_env("HNSW_THRESHOLD", "5000"))
+    HNSW_M: int = int(_env("HNSW_M", "32"))
+    HNSW_EF_CONSTRUCTION: int = int(_env("HNSW_EF_CONSTRUCTION", "200"))
+    HNSW_EF_SEARCH: int = int(_env("HNSW_EF_SEARCH", "64"))  # also applied to indexes loaded from disk
+    IVFPQ_THRESHOLD: int = int(_env("IVFPQ_THRESHOLD", "2000"))
+    IVFPQ_NLIST: int = int(_env("IVFPQ_NLIST", "0"))  # 0 = about 4*sqrt(chunks)
+    IVFPQ_M: int = int(_env("IVFPQ_M", "32"))
+    IVFPQ_NPROBE: int = int(_env("IVFPQ_NPROBE", "16"))
+    SQ8_THRESHOLD: int = int(_env("SQ8_THRESHOLD", "2000"))
+    # OpenMP threads for interactive FAISS searches (bulk index builds use all cores)
+    FAISS_OMP_THREADS: int = int(_env("FAISS_OMP_THREADS", "4"))
     
     # UI Settings
-    MAX_CHAT_HISTORY: int = int(os.getenv("MAX_CHAT_HISTORY", "10"))
-    ENABLE_ANALYTICS: bool = os.getenv("ENABLE_ANALYTICS", "true").lower() == "true"
+    MAX_CHAT_HISTORY: int = int(_env("MAX_CHAT_HISTORY", "10"))
+    ENABLE_ANALYTICS: bool = _env("ENABLE_ANALYTICS", "true").lower() == "true"
     
     @classmethod
     def validate(cls) -> bool:
@@ -91,6 +124,42 @@ class Config:
         if cls.CHUNK_OVERLAP >= cls.MAX_CHUNK_SIZE:
             errors.append("CHUNK_OVERLAP must be less than MAX_CHUNK_SIZE")
         
+        if cls.EMBEDDING_BATCH_SIZE < 0:
+            errors.append("EMBEDDING_BATCH_SIZE must not be negative")
+        
+        if cls.EMBEDDING_BACKEND not in ("torch", "onnx", "openvino"):
+            errors.append("EMBEDDING_BACKEND must be one of: torch, onnx, openvino")
+        
+        if cls.EMBEDDING_DTYPE not in ("float32", "float16", "bfloat16"):
+            errors.append("EMBEDDING_DTYPE must be one of: float32, float16, bfloat16")
+        
+        if cls.VECTOR_INDEX_TYPE not in ("hnsw", "ivfpq", "sq8", "flat"):
+            errors.append("VECTOR_INDEX_TYPE must be one of: hnsw, ivfpq, sq8, flat")
+        
+        if cls.HNSW_M < 2:
+            errors.append("HNSW_M must be at least 2")
+        
+        if cls.HNSW_EF_CONSTRUCTION < 1 or cls.HNSW_EF_SEARCH < 1:
+            errors.append("HNSW_EF_CONSTRUCTION and HNSW_EF_SEARCH must be at least 1")
+        
+        if cls.IVFPQ_M < 1:
+            errors.append("IVFPQ_M must be at least 1")
+        
+        if cls.IVFPQ_NLIST < 0:
+            errors.append("IVFPQ_NLIST must not be negative")
+        
+        if cls.IVFPQ_NPROBE < 1:
+            errors.append("IVFPQ_NPROBE must be at least 1")
+        
+        if min(cls.HNSW_THRESHOLD, cls.IVFPQ_THRESHOLD, cls.SQ8_THRESHOLD) < 0:
+            errors.append("HNSW_THRESHOLD, IVFPQ_THRESHOLD and SQ8_THRESHOLD must not be negative")
+        
+        if cls.VECTOR_INDEX_TYPE == "ivfpq" and cls.IVFPQ_THRESHOLD < 256:
+            errors.append("IVFPQ_THRESHOLD must be at least 256 (PQ training needs 256 vectors)")
+        
+        if cls.FAISS_OMP_THREADS < 1:
+            errors.append("FAISS_OMP_THREADS must be at least 1")
+        
         if errors:
             for error in errors:
                 logger.error(f"Configuration error: {error}")
@@ -113,6 +182,7 @@ class Config:
         return {
             "provider": cls.EMBEDDING_MODEL,
             "model_name": cls.EMBEDDING_MODEL_NAME,
+            "batch_size": cls.EMBEDDING_BATCH_SIZE,
         }
 
 
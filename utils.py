@@ -4,7 +4,17 @@ Utility functions for RAG chatbot: PDF extraction, metadata parsing, embeddings,
 import os
 import re
 import io
+import hashlib
+import math
+import shutil
+import sqlite3
 import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain
 from typing import List, Dict, Optional, Tuple
 import PyPDF2
 from pdf2image import convert_from_path
@@ -37,20 +47,112 @@ try:
     OLLAMA_AVAILABLE = True
 except ImportError:
     OLLAMA_AVAILABLE = False
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
+import numpy as np
 import pickle
 
 logger = logging.getLogger(__name__)
 
+# Shared GPU scratch memory for FAISS (allocated once per process, reused by every search)
+_FAISS_GPU_RESOURCES = None
+
+# Set once persisted data has been cleared; Streamlit re-runs app.py per page load,
+# but this module stays imported for the life of the server process
+_PERSISTENCE_CLEANED = False
+
+
+# PDFium is not thread-safe, even across different documents: every pypdfium2 call made
+# while OCR uploads run in a thread pool has to hold this lock
+_PDFIUM_LOCK = threading.Lock()
+
+# IVF-PQ trains 256 centroids per PQ sub-quantizer, so it needs at least this many vectors
+IVFPQ_MIN_TRAIN = 256
+
+# Pages whose text layer has fewer characters than this are treated as scanned and OCR'd
+OCR_PAGE_MIN_CHARS = 50
+# Resolution pages are rasterized at for OCR
+OCR_DPI = 200
+
+
+def _extract_pdf_pages(pdf_path: str) -> List[str]:
+    """
+    Read a PDF's embedded text, one string per page.
+    Uses PDFium (C++) when pypdfium2 is installed, which is many times faster than
+    PyPDF2's pure-Python parser, and PyPDF2 otherwise.
+    """
+    if PDFIUM_AVAILABLE:
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(pdf_path)
+            try:
+                pages = []
+                for page in pdf:
+                    textpage = page.get_textpage()
+                    # PDFium ends lines with CRLF; metadata parsing splits on "\n"
+                    pages.append(textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n"))
+                    textpage.close()
+                    page.close()
+            finally:
+                pdf.close()
+        return pages
+    
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [page.extract_text() or "" for page in pdf_reader.pages]
+
+
+def _ocr_pdf_pages(pdf_path: str, page_indexes: List[int]) -> Dict[int, str]:
+    """
+    Rasterize only the given pages and OCR them.
+    PDFium renders in-process under _PDFIUM_LOCK, so only tesseract overlaps across
+    threads; without it each page goes through pdf2image (poppler).
+    
+    Returns:
+        OCR text keyed by page index
+    """
+    ocr_text = {}
+    if PDFIUM_AVAILABLE:
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            for index in page_indexes:
+                with _PDFIUM_LOCK:
+                    page = pdf[index]
+                    bitmap = page.render(scale=OCR_DPI / 72)
+                    # Copy out of the PDFium buffer so the bitmap is freed while the lock is held
+                    image = bitmap.to_pil().copy()
+                    bitmap.close()
+                    page.close()
+                ocr_text[index] = pytesseract.image_to_string(image)
+        finally:
+            with _PDFIUM_LOCK:
+                pdf.close()
+        return ocr_text
+    
+    for index in page_indexes:
+        images = convert_from_path(pdf_path, dpi=OCR_DPI, first_page=index + 1, last_page=index + 1)
+        ocr_text[index] = pytesseract.image_to_string(images[0])
+    return ocr_text
+
 
 def extract_text_from_pdf(pdf_path: str, use_ocr: bool = False) -> str:
     """
-    Extract text from PDF using PyPDF2, with OCR fallback if needed.
+    Extract text from PDF using PDFium or PyPDF2, OCR-ing pages that have no text layer.
     
     Args:
         pdf_path: Path to PDF file
-        use_ocr: Whether to use OCR if text extraction fails
+        use_ocr: Whether to OCR scanned pages (pages of a document with almost
+            no extractable text are OCR'd either way)
         
     Returns:
         Extracted text string
@@ -58,23 +160,21 @@ def extract_text_from_pdf(pdf_path: str, use_ocr: bool = False) -> str:
     text = ""
     
     try:
-        # Try PyPDF2 first
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+        # Try the PDF's text layer first
+        pages = _extract_pdf_pages(pdf_path)
         
-        # If text extraction yields very little text, use OCR
-        if use_ocr or len(text.strip()) < 100:
-            try:
-                images = convert_from_path(pdf_path)
-                ocr_text = ""
-                for image in images:
-                    ocr_text += pytesseract.image_to_string(image) + "\n"
-                if len(ocr_text.strip()) > len(text.strip()):
-                    text = ocr_text
-            except Exception as e:
-                print(f"OCR failed: {e}, using PyPDF2 text")
+        # Rasterize and OCR only the pages without a usable text layer
+        if use_ocr or len("".join(pages).strip()) < 100:
+            scanned = [i for i, page_text in enumerate(pages) if len(page_text.strip()) < OCR_PAGE_MIN_CHARS]
+            if scanned:
+                try:
+                    for i, ocr_text in _ocr_pdf_pages(pdf_path, scanned).items():
+                        if len(ocr_text.strip()) > len(pages[i].strip()):
+                            pages[i] = ocr_text
+                except Exception as e:
+                    print(f"OCR failed: {e}, using extracted text")
+        
+        text = "".join(f"{page_text}\n" for page_text in pages)
                 
     except Exception as e:
         print(f"Error extracting text from {pdf_path}: {e}")
@@ -89,6 +189,33 @@ def extract_text_from_pdf(pdf_path: str, use_ocr: bool = False) -> str:
     return text
 
 
+# Lines matching any of these are headers, titles or contact details rather than a
+# candidate name; compiled once into a single alternation for extract_metadata
+_NAME_EXCLUDE_RE = re.compile("|".join([
+    r'CERTIFICATE',
+    r'RESUME',
+    r'CV',
+    r'CURRICULUM',
+    r'VITAE',
+    r'APPLICATION',
+    r'COVER LETTER',
+    r'PAGE \d+',
+    r'\d+/\d+/\d+',  # Dates
+    r'\d{4}',  # Years alone
+    r'PHONE',
+    r'EMAIL',
+    r'ADDRESS',
+    r'CONTACT',
+    r'OBJECTIVE',
+    r'SUMMARY',
+    r'EXPERIENCE',
+    r'EDUCATION',
+    r'SKILLS',
+    r'PROJECT',
+    r'REFERENCES',
+]))
+
+
 def extract_metadata(text: str, filename: str) -> Dict[str, str]:
     """
     Extract metadata from resume text: name, email, phone, skills, experience, education, etc.
@@ -140,32 +267,7 @@ def extract_metadata(text: str, filename: str) -> Dict[str, str]:
             metadata["phone"] = phone
             break
     
-    # Extract name - improved logic to filter out headers
-    # Common patterns to exclude (headers, titles, etc.)
-    exclude_patterns = [
-        r'CERTIFICATE',
-        r'RESUME',
-        r'CV',
-        r'CURRICULUM',
-        r'VITAE',
-        r'APPLICATION',
-        r'COVER LETTER',
-        r'PAGE \d+',
-        r'\d+/\d+/\d+',  # Dates
-        r'\d{4}',  # Years alone
-        r'PHONE',
-        r'EMAIL',
-        r'ADDRESS',
-        r'CONTACT',
-        r'OBJECTIVE',
-        r'SUMMARY',
-        r'EXPERIENCE',
-        r'EDUCATION',
-        r'SKILLS',
-        r'PROJECT',
-        r'REFERENCES',
-    ]
-    
+    # Extract name - improved logic to filter out headers (see _NAME_EXCLUDE_RE)
     # Try to extract name from filename first (often contains name)
     filename_base = os.path.splitext(filename)[0]  # Remove extension
     # Remove common separators and check if it looks like a name
@@ -193,9 +295,7 @@ def extract_metadata(text: str, filename: str) -> Dict[str, str]:
             
             # Skip lines that are clearly not names
             line_upper = line.upper()
-            is_excluded = any(re.search(pattern, line_upper) for pattern in exclude_patterns)
-            
-            if is_excluded:
+            if _NAME_EXCLUDE_RE.search(line_upper):
                 continue
             
             # Skip lines with email
@@ -1014,9 +1114,21 @@ def get_embeddings():
         from config import Config
         embedding_provider = Config.EMBEDDING_MODEL
         model_name = Config.EMBEDDING_MODEL_NAME
+        batch_size = Config.EMBEDDING_BATCH_SIZE
+        embedding_backend = Config.EMBEDDING_BACKEND
+        embedding_model_file = Config.EMBEDDING_MODEL_FILE
+        embedding_dtype = Config.EMBEDDING_DTYPE
     except ImportError:
         embedding_provider = os.getenv("EMBEDDING_MODEL", "openai")
         model_name = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+        batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "0"))
+        embedding_backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+        embedding_model_file = os.getenv("EMBEDDING_MODEL_FILE", "")
+        embedding_dtype = os.getenv("EMBEDDING_DTYPE", "float32").lower()
+    
+    # Batch sizes for embed_documents: remote APIs prefer large requests, local models smaller batches
+    api_batch_size = batch_size or 512
+    local_batch_size = batch_size or 64
     
     openai_api_key = os.getenv("OPENAI_API_KEY", "").strip()
     azure_key = os.getenv("AZURE_OPENAI_KEY", "").strip()
@@ -1039,7 +1151,8 @@ def get_embeddings():
                 azure_deployment=azure_embedding_deployment,
                 azure_endpoint=azure_endpoint,
                 api_key=azure_key,
-                api_version=azure_api_version
+                api_version=azure_api_version,
+                chunk_size=api_batch_size
             )
         except Exception as e:
             logger.warning(f"Failed to initialize Azure OpenAI embeddings: {e}, falling back to local")
@@ -1051,16 +1164,42 @@ def get_embeddings():
     if embedding_provider == "openai" and openai_api_key:
         try:
             logger.info("Using OpenAI embeddings")
-            return OpenAIEmbeddings()
+            return OpenAIEmbeddings(chunk_size=api_batch_size)
         except Exception as e:
             logger.warning(f"Failed to initialize OpenAI embeddings: {e}, falling back to local")
     
     # Fallback to sentence-transformers
     if HUGGINGFACE_AVAILABLE:
+        # Unit-length vectors (as OpenAI's already are) make the L2 index rank exactly
+        # by cosine similarity, since ||x - q||^2 = 2 - 2 x.q, with no per-query work
+        encode_kwargs = {"batch_size": local_batch_size, "normalize_embeddings": True}
+        if embedding_backend != "torch":
+            # ONNX Runtime / OpenVINO (sentence-transformers 3.2+ with optimum installed);
+            # an int8-quantized export such as onnx/model_qint8_avx512_vnni.onnx is
+            # several times faster than PyTorch on CPU
+            model_kwargs = {"backend": embedding_backend}
+            if embedding_model_file:
+                model_kwargs["model_kwargs"] = {"file_name": embedding_model_file}
+            try:
+                logger.info(f"Using HuggingFace embeddings with model: {model_name} ({embedding_backend} backend)")
+                return HuggingFaceEmbeddings(
+                    model_name=model_name,
+                    model_kwargs=model_kwargs,
+                    encode_kwargs=encode_kwargs
+                )
+            except Exception as e:
+                logger.warning(f"Failed to load the {embedding_backend} embedding backend: {e}, falling back to PyTorch")
+        # Half-precision weights halve the memory traffic of every forward pass
+        # (float16 needs a GPU; bfloat16 also runs on CPUs with AVX512-BF16/AMX)
+        model_kwargs = {}
+        if embedding_dtype != "float32":
+            model_kwargs["model_kwargs"] = {"torch_dtype": embedding_dtype}
         try:
-            logger.info(f"Using HuggingFace embeddings with model: {model_name}")
+            logger.info(f"Using HuggingFace embeddings with model: {model_name} ({embedding_dtype})")
             return HuggingFaceEmbeddings(
-                model_name=model_name
+                model_name=model_name,
+                model_kwargs=model_kwargs,
+                encode_kwargs=encode_kwargs
             )
         except Exception as e:
             logger.error(f"Failed to initialize HuggingFace embeddings: {e}")
@@ -1158,6 +1297,141 @@ def get_llm():
     return None
 
 
+def _embedding_model_id(embeddings) -> str:
+    """Identify the model behind an Embeddings instance, so cached vectors never mix models."""
+    model = getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None) or ""
+    normalized = (getattr(embeddings, "encode_kwargs", None) or {}).get("normalize_embeddings", False)
+    # Quantized ONNX/OpenVINO exports and half-precision weights give slightly
+    # different vectors than the float32 PyTorch weights
+    model_kwargs = getattr(embeddings, "model_kwargs", None) or {}
+    backend = model_kwargs.get("backend", "")
+    model_file = (model_kwargs.get("model_kwargs") or {}).get("file_name", "")
+    dtype = (model_kwargs.get("model_kwargs") or {}).get("torch_dtype", "")
+    # Azure picks the model by deployment (model keeps its class default), and
+    # text-embedding-3 models can be shortened with dimensions
+    deployment = getattr(embeddings, "deployment", None) or ""
+    dimensions = getattr(embeddings, "dimensions", None)
+    return (f"{type(embeddings).__name__}:{model}{':normalized' if normalized else ''}"
+            f"{f':{backend}' if backend else ''}{f':{model_file}' if model_file else ''}"
+            f"{f':{dtype}' if dtype else ''}{f':deployment={deployment}' if deployment else ''}"
+            f"{f':dimensions={dimensions}' if dimensions else ''}")
+
+
+def _read_embedding_cache(cache_file: str, model_id: str, keys: List[bytes]) -> Dict[bytes, List[float]]:
+    """Return the cached vectors for the given text keys (missing keys are left out)."""
+    found = {}
+    try:
+        with sqlite3.connect(cache_file) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(model TEXT NOT NULL, key BLOB NOT NULL, vector BLOB NOT NULL, PRIMARY KEY (model, key))"
+            )
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({','.join('?' * len(batch))})",
+                    [model_id, *batch]
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+    except sqlite3.Error as e:
+        logger.warning(f"Embedding cache unavailable, embedding everything: {e}")
+    return found
+
+
+def _write_embedding_cache(cache_file: str, model_id: str, keys: List[bytes], vectors: List[List[float]]):
+    """Store freshly computed vectors in the embedding cache."""
+    try:
+        with sqlite3.connect(cache_file) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, key, vector) VALUES (?, ?, ?)",
+                [(model_id, key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in zip(keys, vectors)]
+            )
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to update embedding cache: {e}")
+
+
+def embed_unique_texts(embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embed texts, sending each distinct text to the model only once.
+    Resume boilerplate (section headers, template footers) repeats across candidates,
+    so duplicates reuse the vector of their first occurrence. When EMBEDDING_CACHE_FILE
+    is set, vectors are also looked up in and saved to that on-disk cache, so
+    re-uploading a resume after a restart skips the model.
+    
+    Args:
+        embeddings: Embeddings instance
+        texts: Texts to embed, possibly with duplicates
+        
+    Returns:
+        One vector per input text, in input order
+    """
+    try:
+        from config import Config
+        cache_file = Config.EMBEDDING_CACHE_FILE
+    except ImportError:
+        cache_file = os.getenv("EMBEDDING_CACHE_FILE", "")
+    
+    keys = [hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest() for text in texts]
+    first_index = {}
+    for i, key in enumerate(keys):
+        first_index.setdefault(key, i)
+    
+    model_id = _embedding_model_id(embeddings)
+    vector_by_key = _read_embedding_cache(cache_file, model_id, list(first_index)) if cache_file else {}
+    missing = [key for key in first_index if key not in vector_by_key]
+    
+    if missing:
+        new_vectors = embeddings.embed_documents([texts[first_index[key]] for key in missing])
+        vector_by_key.update(zip(missing, new_vectors))
+        if cache_file:
+            _write_embedding_cache(cache_file, model_id, missing, new_vectors)
+    
+    if len(missing) < len(texts):
+        logger.info(f"Embedding {len(missing)} new chunks out of {len(texts)} (duplicates and cached chunks reused)")
+    return [vector_by_key[key] for key in keys]
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a time-to-live.
+    Used for retrieval results, which must be dropped whenever the store changes.
+    """
+    
+    def __init__(self, max_size: int = 512, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expiry)
+        self._lock = threading.RLock()
+    
+    def get(self, key):
+        """Return the cached value, or None if it is missing or has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expiry = entry
+            if expiry < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries beyond max_size."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
 def create_vector_store(documents: List[Document], embeddings, persist_dir: Optional[str] = None) -> FAISS:
     """
     Create FAISS vector store from documents.
@@ -1170,18 +1444,386 @@ def create_vector_store(documents: List[Document], embeddings, persist_dir: Opti
     Returns:
         FAISS vector store
     """
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    
     if not documents:
         raise ValueError("No documents provided")
     
-    vector_store = FAISS.from_documents(documents, embeddings)
+    # Embed every distinct chunk in one batched call
+    texts = [doc.page_content for doc in documents]
+    vectors = embed_unique_texts(embeddings, texts)
+    metadatas = [doc.metadata for doc in documents]
+    with faiss_bulk_threads():
+        # Uploads already past the size threshold go straight into the scaled index
+        # rather than through a flat index that would immediately be rebuilt
+        index = _new_scaled_index(np.asarray(vectors, dtype=np.float32), faiss.METRIC_L2)
+        if index is None:
+            vector_store = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas)
+        else:
+            vector_store = FAISS(embeddings, index, InMemoryDocstore(), {})
+            vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas)
+            logger.info(f"Built FAISS index as {type(index).__name__} for {index.ntotal} vectors")
     
     if persist_dir:
-        os.makedirs(persist_dir, exist_ok=True)
-        vector_store.save_local(persist_dir)
+        save_vector_store(vector_store, persist_dir)
+    
+    return move_index_to_gpu(vector_store)
+
+
+def upgrade_index_if_needed(vector_store: FAISS) -> FAISS:
+    """
+    Rebuild a flat (brute-force) FAISS index once the corpus grows past a size threshold.
+    VECTOR_INDEX_TYPE selects the replacement: "hnsw" (default) above HNSW_THRESHOLD,
+    "ivfpq" (product-quantized, ~16-32x smaller) above IVFPQ_THRESHOLD, "sq8" (int8 scalar
+    quantized, 4x smaller, still exhaustive) above SQ8_THRESHOLD, or "flat" to never rebuild.
+    
+    Args:
+        vector_store: FAISS vector store
+        
+    Returns:
+        The same vector store, with its index replaced if an upgrade was needed
+    """
+    import faiss
+    
+    index_type, threshold = _scaled_index_target()
+    index = vector_store.index
+    if index_type == "flat" or index.ntotal <= threshold:
+        return vector_store
+    
+    cpu_index = faiss.index_gpu_to_cpu(index) if _is_gpu_index(index) else index
+    if not isinstance(cpu_index, faiss.IndexFlat):
+        return vector_store
+    
+    vectors = cpu_index.reconstruct_n(0, cpu_index.ntotal)
+    scaled_index = _new_scaled_index(vectors, cpu_index.metric_type)
+    if scaled_index is None:
+        return vector_store
+    scaled_index.add(vectors)
+    vector_store.index = scaled_index
+    logger.info(f"Rebuilt FAISS index as {type(scaled_index).__name__} for {scaled_index.ntotal} vectors")
+    # The rebuilt index is on CPU; move it back with the GPU options for its type
+    return move_index_to_gpu(vector_store)
+
+
+def _scaled_index_target():
+    """Return the configured (VECTOR_INDEX_TYPE, size threshold) for replacing a flat index."""
+    try:
+        from config import Config
+        index_type = Config.VECTOR_INDEX_TYPE
+        threshold = {"ivfpq": Config.IVFPQ_THRESHOLD, "sq8": Config.SQ8_THRESHOLD}.get(index_type, Config.HNSW_THRESHOLD)
+    except ImportError:
+        index_type = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()
+        if index_type == "ivfpq":
+            threshold = int(os.getenv("IVFPQ_THRESHOLD", "2000"))
+        elif index_type == "sq8":
+            threshold = int(os.getenv("SQ8_THRESHOLD", "2000"))
+        else:
+            threshold = int(os.getenv("HNSW_THRESHOLD", "5000"))
+    
+    return index_type, threshold
+
+
+def _new_scaled_index(vectors, metric_type):
+    """
+    Create the empty (trained, where needed) VECTOR_INDEX_TYPE index for a collection
+    of these vectors, or return None while a flat index is still the better choice.
+    The caller adds the vectors.
+    """
+    index_type, threshold = _scaled_index_target()
+    if index_type == "flat" or len(vectors) <= threshold:
+        return None
+    if index_type == "ivfpq":
+        if len(vectors) < IVFPQ_MIN_TRAIN:
+            # Too few vectors to train the 8-bit PQ codebooks, even if IVFPQ_THRESHOLD allows it
+            return None
+        return _build_ivfpq_index(vectors, metric_type)
+    if index_type == "sq8":
+        return _build_sq8_index(vectors, metric_type)
+    return _build_hnsw_index(vectors.shape[1], metric_type)
+
+
+def _build_hnsw_index(dimension: int, metric_type):
+    """Create an empty HNSW graph index (HNSW needs no training)."""
+    import faiss
+    try:
+        from config import Config
+        hnsw_m = Config.HNSW_M
+        ef_construction = Config.HNSW_EF_CONSTRUCTION
+        ef_search = Config.HNSW_EF_SEARCH
+    except ImportError:
+        hnsw_m = int(os.getenv("HNSW_M", "32"))
+        ef_construction = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+        ef_search = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    
+    hnsw_index = faiss.IndexHNSWFlat(dimension, hnsw_m, metric_type)
+    hnsw_index.hnsw.efConstruction = ef_construction
+    hnsw_index.hnsw.efSearch = ef_search
+    return hnsw_index
+
+
+def _build_ivfpq_index(vectors, metric_type):
+    """Create and train an empty IVF-PQ index, sizing nlist and PQ sub-quantizers to the data."""
+    import faiss
+    try:
+        from config import Config
+        nlist = Config.IVFPQ_NLIST
+        pq_m = Config.IVFPQ_M
+        nprobe = Config.IVFPQ_NPROBE
+    except ImportError:
+        nlist = int(os.getenv("IVFPQ_NLIST", "0"))
+        pq_m = int(os.getenv("IVFPQ_M", "32"))
+        nprobe = int(os.getenv("IVFPQ_NPROBE", "16"))
+    
+    n, d = vectors.shape
+    if nlist <= 0:
+        # Usual IVF sizing: partitions grow with the square root of the collection
+        nlist = round(4 * math.sqrt(n))
+    # k-means needs a few dozen points per centroid; PQ sub-quantizers must divide the dimension
+    nlist = max(1, min(nlist, n // 39))
+    pq_m = max(1, min(pq_m, d))
+    while d % pq_m:
+        pq_m -= 1
+    
+    ivfpq_index = faiss.index_factory(d, f"IVF{nlist},PQ{pq_m}", metric_type)
+    train_size = min(n, 10000)
+    sample = vectors[np.random.default_rng(0).choice(n, train_size, replace=False)] if n > train_size else vectors
+    ivfpq_index.train(sample)
+    ivfpq_index.nprobe = min(nprobe, nlist)
+    logger.info(f"Trained IVF{nlist},PQ{pq_m} index on {len(sample)} vectors")
+    return ivfpq_index
+
+
+def apply_search_params(index):
+    """
+    Set HNSW_EF_SEARCH / IVFPQ_NPROBE on a CPU index. Indexes loaded from disk keep the
+    values they were saved with, so this applies the current configuration to them.
+    """
+    import faiss
+    try:
+        from config import Config
+        ef_search = Config.HNSW_EF_SEARCH
+        nprobe = Config.IVFPQ_NPROBE
+    except ImportError:
+        ef_search = int(os.getenv("HNSW_EF_SEARCH", "64"))
+        nprobe = int(os.getenv("IVFPQ_NPROBE", "16"))
+    
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(nprobe, index.nlist)
+    return index
+
+
+def _build_sq8_index(vectors, metric_type):
+    """Create and train an empty flat index storing each dimension as an 8-bit code (4x less memory than float32)."""
+    import faiss
+    sq8_index = faiss.IndexScalarQuantizer(vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, metric_type)
+    # Training only records each dimension's value range, so it uses every vector
+    sq8_index.train(vectors)
+    return sq8_index
+
+
+def available_cpu_count() -> int:
+    """
+    CPUs this process may run on. Unlike os.cpu_count(), this respects CPU sets
+    (taskset, container cpusets), so thread pools aren't sized for cores they can't use.
+    """
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:
+        # sched_getaffinity is Linux-only
+        return os.cpu_count() or 1
+
+
+def _interactive_faiss_threads() -> int:
+    """The FAISS OpenMP thread count for interactive searches: FAISS_OMP_THREADS, capped at the usable cores."""
+    try:
+        from config import Config
+        num_threads = Config.FAISS_OMP_THREADS
+    except ImportError:
+        num_threads = int(os.getenv("FAISS_OMP_THREADS", "4"))
+    return min(num_threads, available_cpu_count())
+
+
+def configure_faiss_threads():
+    """
+    Cap FAISS OpenMP threads for interactive searches.
+    Single-query searches are not parallelized by FAISS, so a full core pool only adds
+    thread start-up overhead; batched adds raise the limit via faiss_bulk_threads().
+    """
+    try:
+        import faiss
+        faiss.omp_set_num_threads(_interactive_faiss_threads())
+    except (ImportError, AttributeError):
+        pass
+
+
+# The OpenMP thread count is process-wide, shared by every Streamlit session, so
+# bulk sections run one at a time
+_FAISS_BULK_LOCK = threading.Lock()
+
+
+@contextmanager
+def faiss_bulk_threads():
+    """
+    Temporarily let FAISS use every available core for batched index additions.
+    Concurrent uploads wait for each other, and the interactive cap is restored on exit
+    (rather than whatever value was read on entry), so overlapping uploads can't leave
+    it raised. Searches in other sessions share the raised count while a bulk add runs.
+    """
+    try:
+        import faiss
+        set_threads = faiss.omp_set_num_threads
+    except (ImportError, AttributeError):
+        set_threads = None
+    if set_threads is None:
+        yield
+        return
+    with _FAISS_BULK_LOCK:
+        set_threads(available_cpu_count())
+        try:
+            yield
+        finally:
+            set_threads(_interactive_faiss_threads())
+
+
+def _is_gpu_index(index) -> bool:
+    """Check whether a FAISS index lives on GPU (single device or replicated)."""
+    import faiss
+    return type(index).__name__.startswith("Gpu") or isinstance(index, getattr(faiss, "IndexReplicas", ()))
+
+
+def is_flat_index(vector_store: FAISS) -> bool:
+    """
+    Check whether a store's index is flat (brute force on CPU or GPU, full precision
+    or SQ8), so every search scans all vectors.
+    """
+    try:
+        import faiss
+    except ImportError:
+        return False
+    index = vector_store.index
+    return (isinstance(index, (faiss.IndexFlat, faiss.IndexScalarQuantizer))
+            or type(index).__name__.startswith("GpuIndexFlat"))
+
+
+def search_by_vectors(vector_store: FAISS, vectors: List[List[float]], k: int) -> List[List[Tuple[Document, float]]]:
+    """
+    Search several query vectors in one FAISS call (one batched scan or graph
+    traversal instead of one per query).
     
+    Args:
+        vector_store: FAISS vector store
+        vectors: Query embeddings
+        k: Results per query
+        
+    Returns:
+        For each query, (document, distance) pairs best-first, as
+        similarity_search_with_score_by_vector would return them
+    """
+    import faiss
+    
+    queries = np.asarray(vectors, dtype=np.float32)
+    if getattr(vector_store, "_normalize_L2", False):
+        faiss.normalize_L2(queries)
+    distances, indices = vector_store.index.search(queries, k)
+    
+    results = []
+    for row_distances, row_indices in zip(distances.tolist(), indices.tolist()):
+        hits = []
+        for distance, i in zip(row_distances, row_indices):
+            # -1 pads rows when the index holds fewer than k vectors
+            if i == -1:
+                continue
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+            if isinstance(doc, Document):
+                hits.append((doc, distance))
+        results.append(hits)
+    return results
+
+
+def move_index_to_gpu(vector_store: FAISS) -> FAISS:
+    """
+    Move the FAISS index to GPU when faiss-gpu and a CUDA device are available.
+    Falls back silently to the CPU index otherwise.
+    
+    Args:
+        vector_store: FAISS vector store
+        
+    Returns:
+        The same vector store, with its index on GPU if possible
+    """
+    global _FAISS_GPU_RESOURCES
+    try:
+        import faiss
+        num_gpus = faiss.get_num_gpus()
+    except (ImportError, AttributeError):
+        return vector_store
+    
+    # HNSW and flat SQ8 have no GPU implementation, so those indexes stay on CPU
+    if (num_gpus == 0 or _is_gpu_index(vector_store.index)
+            or isinstance(vector_store.index, (faiss.IndexHNSW, faiss.IndexScalarQuantizer))):
+        return vector_store
+    
+    options = None
+    if isinstance(vector_store.index, faiss.IndexIVFPQ):
+        # fp16 lookup tables without precomputed codes keep PQ within GPU scratch memory
+        options = faiss.GpuClonerOptions() if num_gpus == 1 else faiss.GpuMultipleClonerOptions()
+        options.useFloat16 = True
+        options.usePrecomputed = False
+    
+    try:
+        if num_gpus > 1:
+            vector_store.index = faiss.index_cpu_to_all_gpus(vector_store.index, co=options)
+        else:
+            if _FAISS_GPU_RESOURCES is None:
+                _FAISS_GPU_RESOURCES = faiss.StandardGpuResources()
+            vector_store.index = faiss.index_cpu_to_gpu(_FAISS_GPU_RESOURCES, 0, vector_store.index, options)
+        logger.info(f"Moved FAISS index to {num_gpus} GPU(s)")
+    except Exception as e:
+        logger.warning(f"Could not move FAISS index to GPU: {e}, using CPU index")
     return vector_store
 
 
+def save_vector_store(vector_store: FAISS, persist_dir: str):
+    """Persist a FAISS vector store, copying GPU indexes back to CPU for serialization."""
+    os.makedirs(persist_dir, exist_ok=True)
+    index = vector_store.index
+    if _is_gpu_index(index):
+        import faiss
+        vector_store.index = faiss.index_gpu_to_cpu(index)
+    try:
+        vector_store.save_local(persist_dir)
+    finally:
+        vector_store.index = index
+
+
+def add_documents_to_store(vector_store: FAISS, documents: List[Document], embeddings) -> FAISS:
+    """
+    Add documents to an existing FAISS vector store using a single batched embedding call.
+    
+    Args:
+        vector_store: Existing FAISS vector store
+        documents: List of Document objects to add
+        embeddings: Embeddings instance
+        
+    Returns:
+        The updated FAISS vector store
+    """
+    if not documents:
+        return vector_store
+    
+    texts = [doc.page_content for doc in documents]
+    vectors = embed_unique_texts(embeddings, texts)
+    with faiss_bulk_threads():
+        vector_store.add_embeddings(
+            list(zip(texts, vectors)),
+            metadatas=[doc.metadata for doc in documents]
+        )
+        return upgrade_index_if_needed(vector_store)
+
+
 def load_vector_store(embeddings, persist_dir: str) -> Optional[FAISS]:
     """
     Load existing FAISS vector store.
@@ -1198,7 +1840,9 @@ def load_vector_store(embeddings, persist_dir: str) -> Optional[FAISS]:
             # Check if index file exists
             index_file = os.path.join(persist_dir, "index.faiss")
             if os.path.exists(index_file):
-                return FAISS.load_local(persist_dir, embeddings, allow_dangerous_deserialization=True)
+                vector_store = FAISS.load_local(persist_dir, embeddings, allow_dangerous_deserialization=True)
+                apply_search_params(vector_store.index)
+                return move_index_to_gpu(vector_store)
     except Exception as e:
         print(f"Error loading vector store: {e}")
     return None
@@ -1229,12 +1873,44 @@ def chunk_text(text: str, chunk_size: Optional[int] = None, chunk_overlap: Optio
         if chunk_overlap is None:
             chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "200"))
     
-    text_splitter = RecursiveCharacterTextSplitter(
+    return _get_text_splitter(chunk_size, chunk_overlap).split_text(text)
+
+
+@lru_cache(maxsize=8)
+def _get_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Build the splitter once per chunk size/overlap pair and reuse it for every resume."""
+    return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         length_function=len
     )
-    return text_splitter.split_text(text)
+
+
+_SIMHASH_WORD_RE = re.compile(r"\w+")
+
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash of a text's lowercase words. Near-duplicate texts differ in only a
+    few bits, so comparing two fingerprints is one XOR and a popcount.
+    
+    Args:
+        text: Text to fingerprint
+        
+    Returns:
+        Fingerprint as a non-negative int (0 for text without words)
+    """
+    counts = Counter(_SIMHASH_WORD_RE.findall(text.lower()))
+    if not counts:
+        return 0
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little") for word in counts),
+        dtype=np.uint64, count=len(counts)
+    )
+    # Each word votes +count/-count on every bit by its hash; the fingerprint keeps the winning sign
+    bits = ((hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)).astype(np.int64)
+    weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts)) @ (2 * bits - 1)
+    return int(np.packbits(weights > 0, bitorder="little").view("<u8")[0])
 
 
 def rank_candidates(candidates: List[Dict], query: str, skills_weights: Optional[Dict[str, float]] = None) -> List[Tuple[Dict, float]]:
@@ -1297,6 +1973,95 @@ def rank_candidates(candidates: List[Dict], query: str, skills_weights: Optional
     return ranked
 
 
+def _fit_score_kernel(name_ok, email_ok, phone_ok, skills_n, years, edu_ok, certs_n):
+    """Elementwise Fit Score loop; compiled with Numba when it is installed."""
+    out = np.empty(name_ok.size, np.float64)
+    for i in range(name_ok.size):
+        out[i] = (
+            10.0 * name_ok[i]
+            + 10.0 * email_ok[i]
+            + 10.0 * phone_ok[i]
+            + min(20.0, skills_n[i] * 2.0)
+            + min(25.0, max(years[i], 0.0) * 2.5)
+            + 15.0 * edu_ok[i]
+            + min(10.0, certs_n[i] * 2.0)
+        )
+    return out
+
+
+if NUMBA_AVAILABLE:
+    _fit_score_kernel = njit(cache=True, fastmath=True)(_fit_score_kernel)
+    # Compile (or load from the on-disk cache) at import so the first dashboard render doesn't pay for it
+    _fit_score_kernel(
+        np.zeros(1, np.bool_), np.zeros(1, np.bool_), np.zeros(1, np.bool_),
+        np.zeros(1, np.int64), np.zeros(1, np.float64), np.zeros(1, np.bool_), np.zeros(1, np.int64)
+    )
+
+
+def compute_fit_scores(name_ok, email_ok, phone_ok, skills_n, years, edu_ok, certs_n) -> np.ndarray:
+    """
+    Compute 0-100 Fit Scores for all candidates at once.
+    Name 10, email 10, phone 10, skills 2 each (max 20), experience 2.5/year (max 25),
+    education 15, certifications 2 each (max 10).
+    
+    Args:
+        name_ok, email_ok, phone_ok, edu_ok: Boolean arrays, one entry per candidate
+        skills_n, certs_n: Skill and certification counts
+        years: Years of experience
+        
+    Returns:
+        Float array of scores
+    """
+    name_ok = np.asarray(name_ok, dtype=np.bool_)
+    email_ok = np.asarray(email_ok, dtype=np.bool_)
+    phone_ok = np.asarray(phone_ok, dtype=np.bool_)
+    skills_n = np.asarray(skills_n, dtype=np.int64)
+    years = np.asarray(years, dtype=np.float64)
+    edu_ok = np.asarray(edu_ok, dtype=np.bool_)
+    certs_n = np.asarray(certs_n, dtype=np.int64)
+    
+    if NUMBA_AVAILABLE:
+        return _fit_score_kernel(name_ok, email_ok, phone_ok, skills_n, years, edu_ok, certs_n)
+    
+    return (
+        10.0 * name_ok
+        + 10.0 * email_ok
+        + 10.0 * phone_ok
+        + np.minimum(skills_n * 2.0, 20.0)
+        + np.minimum(np.maximum(years, 0.0) * 2.5, 25.0)
+        + 15.0 * edu_ok
+        + np.minimum(certs_n * 2.0, 10.0)
+    )
+
+
+def candidates_to_csv_bytes(candidates: List[Dict]) -> bytes:
+    """
+    Serialize candidates to CSV in memory.
+    
+    Args:
+        candidates: List of candidate metadata dictionaries
+        
+    Returns:
+        UTF-8 encoded CSV (name, email, phone, skills, filename)
+    """
+    import csv
+    
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=['name', 'email', 'phone', 'skills', 'filename'])
+    writer.writeheader()
+    writer.writerows(
+        {
+            'name': candidate.get('name', ''),
+            'email': candidate.get('email', ''),
+            'phone': candidate.get('phone', ''),
+            'skills': ', '.join(candidate.get('skills', [])),
+            'filename': candidate.get('filename', '')
+        }
+        for candidate in candidates
+    )
+    return buffer.getvalue().encode('utf-8')
+
+
 def export_candidates_to_csv(candidates: List[Dict], filepath: str) -> bool:
     """
     Export candidates to CSV file.
@@ -1309,25 +2074,12 @@ def export_candidates_to_csv(candidates: List[Dict], filepath: str) -> bool:
         True if successful, False otherwise
     """
     try:
-        import csv
-        
         if not candidates:
             logger.warning("No candidates to export")
             return False
         
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['name', 'email', 'phone', 'skills', 'filename']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            for candidate in candidates:
-                writer.writerow({
-                    'name': candidate.get('name', ''),
-                    'email': candidate.get('email', ''),
-                    'phone': candidate.get('phone', ''),
-                    'skills': ', '.join(candidate.get('skills', [])),
-                    'filename': candidate.get('filename', '')
-                })
+        with open(filepath, 'wb') as f:
+            f.write(candidates_to_csv_bytes(candidates))
         
         logger.info(f"Exported {len(candidates)} candidates to {filepath}")
         return True
@@ -1346,11 +2098,7 @@ def get_skills_distribution(candidates: List[Dict]) -> Dict[str, int]:
     Returns:
         Dictionary mapping skill names to count
     """
-    skills_count = {}
-    for candidate in candidates:
-        for skill in candidate.get("skills", []):
-            skills_count[skill] = skills_count.get(skill, 0) + 1
-    return skills_count
+    return dict(Counter(chain.from_iterable(candidate.get("skills", ()) for candidate in candidates)))
 
 
 def process_resume_pdf(pdf_path: str, use_ocr: bool = False) -> Tuple[str, Dict[str, str]]:
@@ -1370,6 +2118,37 @@ def process_resume_pdf(pdf_path: str, use_ocr: bool = False) -> Tuple[str, Dict[
     return text, metadata
 
 
+def clear_persisted_data(persist_dir: str, metadata_file: str):
+    """
+    Delete the persisted vector store and metadata file, once per server process.
+    Used when persistence is disabled so data never leaks between users.
+    
+    Args:
+        persist_dir: Vector store directory
+        metadata_file: Metadata pickle path
+    """
+    global _PERSISTENCE_CLEANED
+    if _PERSISTENCE_CLEANED:
+        return
+    _PERSISTENCE_CLEANED = True
+    
+    try:
+        shutil.rmtree(persist_dir)
+        logger.info("Cleared persistent vector store (persistence disabled)")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not clear vector store: {e}")
+    
+    try:
+        os.remove(metadata_file)
+        logger.info("Cleared persistent metadata (persistence disabled)")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not clear metadata: {e}")
+
+
 def save_metadata(metadata_list: List[Dict], filepath: str):
     """Save metadata list to pickle file."""
     with open(filepath, 'wb') as f: